@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.phone import phone_q, search_digits
+from .models import CustomerProfile
+
+
+@admin.register(CustomerProfile)
+class CustomerProfileAdmin(admin.ModelAdmin):
+    list_display = ("user", "phone", "address")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    search_fields = ("user__username",)
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # a phone number is also an index seek on the digit columns (see
+        # core.phone); usernames are often phone numbers, so both are searched
+        digits = search_digits(search_term)
+        if digits is not None:
+            results |= queryset.filter(phone_q(digits, "phone"))
+        return results, may_have_duplicates
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+from core.phone import normalize
+
+
+def backfill(apps, schema_editor):
+    CustomerProfile = apps.get_model("accounts", "CustomerProfile")
+    table = schema_editor.quote_name(CustomerProfile._meta.db_table)
+    sql = f"UPDATE {table} SET phone_digits = %s, phone_digits_rev = %s WHERE id = %s"
+
+    # one prepared UPDATE per row; bulk_update's CASE WHEN is far slower on big tables
+    with schema_editor.connection.cursor() as cursor:
+        batch = []
+        for pk, phone in CustomerProfile.objects.values_list("id", "phone").iterator(chunk_size=2000):
+            phone = normalize(phone)
+            batch.append((phone, phone[::-1], pk))
+            if len(batch) == 2000:
+                cursor.executemany(sql, batch)
+                batch = []
+        cursor.executemany(sql, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerprofile',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='customerprofile',
+            name='phone_digits_rev',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from core.phone import fill_digits
+
 class CustomerProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     phone = models.CharField(max_length=20, blank=True)
+    # normalized copies for indexed search, kept in sync by save() (see core.phone)
+    phone_digits = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+    phone_digits_rev = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
     address = models.TextField(blank=True)
 
     def __str__(self):
         return self.user.username
+
+    def save(self, *args, update_fields=None, **kwargs):
+        update_fields = fill_digits(self, ("phone",), update_fields)
+        super().save(*args, update_fields=update_fields, **kwargs)
@@ -1,3 +1,89 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from core.testing import TEST_STORAGES, QueryBudgetMixin, seed_catalog, seed_orders
+from .models import CustomerProfile
+
+
+# the default hasher is slow on purpose; these tests time the views
+@override_settings(
+    STORAGES=TEST_STORAGES, PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class AccountsQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+
+    def test_login_and_logout(self):
+        self.assertQueryBudget(lambda: self.client.get("/accounts/login/"), 0)
+        # user lookup, session key check + insert, last_login update, session
+        # save; the savepoints around the session writes count too
+        response = self.assertQueryBudget(
+            lambda: self.client.post("/accounts/login/", {"username": "ravi", "password": "pw"}), 9,
+        )
+        self.assertRedirects(response, "/", fetch_redirect_response=False)
+        self.assertQueryBudget(lambda: self.client.get("/accounts/logout/"), 4)
+
+    def test_signup(self):
+        self.assertQueryBudget(lambda: self.client.get("/accounts/signup/"), 0)
+        response = self.assertQueryBudget(lambda: self.client.post("/accounts/signup/", {
+            "username": "sita", "password": "pw2", "password2": "pw2",
+        }), 2)
+        self.assertRedirects(response, "/accounts/login/", fetch_redirect_response=False)
+        self.assertTrue(User.objects.filter(username="sita").exists())
+
+    def test_profile(self):
+        self.client.force_login(self.user)
+        CustomerProfile.objects.create(user=self.user)
+        self.assertQueryBudget(lambda: self.client.get("/accounts/profile/"), 3)
+        self.assertQueryBudget(lambda: self.client.post("/accounts/profile/", {"phone": "9440574394"}), 4)
+        profile = CustomerProfile.objects.get()
+        self.assertEqual(profile.phone, "9440574394")
+        self.assertEqual(profile.phone_digits_rev, "4934750449")
+
+    def test_order_history(self):
+        self.client.force_login(self.user)
+        products = seed_catalog(30)
+        seed_orders(self.user, products, orders=2, items=2)
+        grow = lambda: seed_orders(self.user, products, orders=5, items=25)
+        # session, user, one page of orders, their items
+        self.assertQueryBudget(lambda: self.client.get("/accounts/orders/"), 4, grow=grow)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CustomerProfileAdminTests(TestCase):
+    def test_search_by_username_or_phone(self):
+        self.client.force_login(User.objects.create_superuser("admin"))
+        ravi = CustomerProfile.objects.create(user=User.objects.create_user("ravi"), phone="+91 94405 74394")
+        numbered = CustomerProfile.objects.create(user=User.objects.create_user("9848022338"), phone="")
+
+        def found(term):
+            response = self.client.get("/admin/accounts/customerprofile/", {"q": term})
+            return {profile.id for profile in response.context["cl"].result_list}
+
+        self.assertEqual(found("ravi"), {ravi.id})
+        self.assertEqual(found("4394"), {ravi.id})
+        self.assertEqual(found("9848022338"), {numbered.id})
+        self.assertEqual(found("5555"), set())
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class OrderHistoryTests(TestCase):
+    def test_pages_through_own_orders_newest_first(self):
+        user = User.objects.create_user("ravi")
+        products = seed_catalog(5)
+        mine = seed_orders(user, products, orders=25, items=2)
+        seed_orders(User.objects.create_user("sita"), products, orders=3)
+        self.client.force_login(user)
+
+        first = self.client.get("/accounts/orders/")
+        self.assertContains(first, "Pen 0 × 2, Item Pen 1 × 2")
+        self.assertContains(first, f"/order/{mine[-1].id}/invoice/pdf/")
+        page = first.context["page"]
+        self.assertEqual([o.id for o in page], [o.id for o in mine[::-1][:20]])
+
+        second = self.client.get("/accounts/orders/", {"after": page.next_cursor}).context["page"]
+        self.assertEqual([o.id for o in second], [o.id for o in mine[::-1][20:]])
+        self.assertFalse(second.has_next)
+
+    def test_requires_login(self):
+        self.assertRedirects(self.client.get("/accounts/orders/"), "/accounts/login/", fetch_redirect_response=False)
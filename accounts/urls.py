@@ -6,4 +6,5 @@ urlpatterns = [
     path("signup/", views.signup, name="signup"),
     path("logout/", views.user_logout, name="logout"),
     path("profile/", views.profile, name="profile"),
+    path("orders/", views.order_history, name="order_history"),
 ]
@@ -1,8 +1,14 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.db.models import Prefetch
+
+from core.pagination import keyset_paginate
+from orders.models import Order, OrderItem
 from .models import CustomerProfile
 
+ORDERS_PER_PAGE = 20
+
 
 def user_login(request):
     if request.method == "POST":
@@ -61,3 +67,17 @@ def profile(request):
         return redirect("profile")
 
     return render(request, "accounts/profile.html", {"profile": profile})
+
+
+def order_history(request):
+    if not request.user.is_authenticated:
+        return redirect("login")
+
+    # item_count and total are stored on the order; the item names come in
+    # one prefetch for the whole page, however many items each order has
+    orders = Order.objects.filter(user=request.user).prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.only("order_id", "product_name", "qty").order_by("id"))
+    )
+    page = keyset_paginate(orders, request.GET.get("after"), per_page=ORDERS_PER_PAGE)
+
+    return render(request, "accounts/order_history.html", {"page": page})
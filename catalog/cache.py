@@ -0,0 +1,115 @@
+import hashlib
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from .version import CACHE_ALIAS, get_catalog_version
+
+_MISSING = object()
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def _namespace(key):
+    """
+    "catalog:<namespace>:<version>:<digest>" for keys made here,
+    "template.cache.<fragment>.<digest>" for {% cache %} fragments.
+    The version key itself is not counted.
+    """
+    if key.startswith("template.cache."):
+        return "fragment"
+    parts = key.split(":")
+    return parts[1] if len(parts) > 2 else None
+
+
+class StatsMixin:
+    """Counts hits and misses per key namespace, for this process."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        namespace = _namespace(key)
+        if namespace:
+            with _lock:
+                _stats[namespace, value is not _MISSING] += 1
+        return default if value is _MISSING else value
+
+
+class FileCatalogCache(StatsMixin, FileBasedCache):
+    pass
+
+
+class LocMemCatalogCache(StatsMixin, LocMemCache):
+    pass
+
+
+def cache_stats():
+    with _lock:
+        counts = dict(_stats)
+
+    stats = {}
+    for namespace in sorted({ns for ns, _ in counts}):
+        hits = counts.get((namespace, True), 0)
+        misses = counts.get((namespace, False), 0)
+        stats[namespace] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 3),
+        }
+    return stats
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+def make_key(namespace, *parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f"catalog:{namespace}:{get_catalog_version()}:{digest}"
+
+
+def get_or_compute(namespace, parts, compute):
+    """
+    compute() for this catalog version, cached. A catalog change moves the
+    version, so stale entries are never read again and simply expire.
+    """
+    cache = caches[CACHE_ALIAS]
+    key = make_key(namespace, *parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT)
+    return value
+
+
+def cache_catalog_page(view):
+    """
+    Cache the whole rendered page of a catalog view for anonymous GETs,
+    keyed on catalog version and full URL. Signed-in users fall through to
+    the view (and its result and fragment caches).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        cache = caches[CACHE_ALIAS]
+        key = make_key("page", request.get_full_path())
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            cache.set(key, (response.content, response["Content-Type"]), settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
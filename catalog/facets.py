@@ -0,0 +1,170 @@
+from collections import Counter
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+from django.utils.http import urlencode
+
+from .models import Brand, Category
+
+# (slug, label, min price inclusive, max price exclusive)
+PRICE_BANDS = (
+    ("0-50", "Under ₹50", None, 50),
+    ("50-100", "₹50 – ₹100", 50, 100),
+    ("100-250", "₹100 – ₹250", 100, 250),
+    ("250-500", "₹250 – ₹500", 250, 500),
+    ("500-", "₹500 & above", 500, None),
+)
+BAND_SLUGS = [slug for slug, _, _, _ in PRICE_BANDS]
+
+
+def _ids(values):
+    return frozenset(int(v) for v in values if v.isdigit())
+
+
+class FacetFilters(NamedTuple):
+    brands: frozenset
+    categories: frozenset
+    bands: frozenset
+    in_stock: bool
+
+    @classmethod
+    def from_params(cls, params):
+        return cls(
+            brands=_ids(params.getlist("brand")),
+            categories=_ids(params.getlist("category")),
+            bands=frozenset(b for b in params.getlist("price") if b in BAND_SLUGS),
+            in_stock=params.get("in_stock") == "1",
+        )
+
+    def __bool__(self):
+        return bool(self.brands or self.categories or self.bands or self.in_stock)
+
+    @property
+    def key(self):
+        """Hashable, order-independent form for cache keys."""
+        return (sorted(self.brands), sorted(self.categories), sorted(self.bands), self.in_stock)
+
+    def as_q(self):
+        q = Q()
+        if self.brands:
+            q &= Q(brand_id__in=self.brands)
+        if self.categories:
+            q &= Q(category_id__in=self.categories)
+        if self.bands:
+            bands = Q()
+            for slug, _, low, high in PRICE_BANDS:
+                if slug in self.bands:
+                    band = Q()
+                    if low is not None:
+                        band &= Q(price__gte=Decimal(low))
+                    if high is not None:
+                        band &= Q(price__lt=Decimal(high))
+                    bands |= band
+            q &= bands
+        if self.in_stock:
+            q &= Q(stock_quantity__gt=0)
+        return q
+
+    def matches(self, row, skip):
+        """Does a facet_rows() row pass every selected filter except skip's?"""
+        brand, category, band, in_stock, _ = row
+        return (
+            (skip == "brand" or not self.brands or brand in self.brands)
+            and (skip == "category" or not self.categories or category in self.categories)
+            and (skip == "price" or not self.bands or band in self.bands)
+            and (skip == "in_stock" or not self.in_stock or in_stock)
+        )
+
+
+def price_band():
+    return Case(
+        *[
+            When(price__lt=Decimal(high), then=Value(slug))
+            for slug, _, _, high in PRICE_BANDS if high is not None
+        ],
+        default=Value(PRICE_BANDS[-1][0]),
+        output_field=CharField(),
+    )
+
+
+def facet_rows(queryset):
+    """
+    One GROUP BY over (brand, category, price band, in stock) for the
+    products in queryset: [(brand_id, category_id, band, in_stock, count)].
+
+    Counts for any combination of selected facets are sums over these rows,
+    so the rows depend only on the search text, not on the selection.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(
+            band=price_band(),
+            in_stock=Case(When(stock_quantity__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField()),
+        )
+        .values_list("brand_id", "category_id", "band", "in_stock")
+        .annotate(n=Count("id"))
+    )
+    return [tuple(row) for row in rows]
+
+
+def facet_counts(rows, filters):
+    """
+    Disjunctive counts: each facet is counted with every other facet's
+    selection applied but not its own, so picking one brand still shows
+    how many products the other brands would add.
+    """
+    counts = {"brand": Counter(), "category": Counter(), "price": Counter(), "in_stock": 0}
+    for row in rows:
+        brand, category, band, in_stock, n = row
+        if filters.matches(row, "brand"):
+            counts["brand"][brand] += n
+        if filters.matches(row, "category"):
+            counts["category"][category] += n
+        if filters.matches(row, "price"):
+            counts["price"][band] += n
+        if in_stock and filters.matches(row, "in_stock"):
+            counts["in_stock"] += n
+    return counts
+
+
+def facet_labels():
+    return {
+        "brand": dict(Brand.objects.filter(is_active=True).values_list("id", "name")),
+        "category": dict(Category.objects.filter(is_active=True).values_list("id", "name")),
+        "price": {slug: label for slug, label, _, _ in PRICE_BANDS},
+    }
+
+
+class FacetOption(NamedTuple):
+    label: str
+    count: int
+    selected: bool
+    url: str
+
+
+def _toggle(params, name, value):
+    """Query string for params with value added to / removed from name."""
+    params = params.copy()
+    params.pop("after", None)
+    values = params.getlist(name)
+    params.setlist(name, [v for v in values if v != value] if value in values else values + [value])
+    return "?" + urlencode(sorted(params.lists()), doseq=True)
+
+
+def build_facets(params, filters, counts, labels):
+    """Options to render for each facet: values with products, plus anything selected."""
+    selected = {"brand": filters.brands, "category": filters.categories, "price": filters.bands}
+    facets = {}
+    for name in ("brand", "category", "price"):
+        options = []
+        for value, label in labels[name].items():
+            count = counts[name][value]
+            if count or value in selected[name]:
+                options.append(FacetOption(label, count, value in selected[name], _toggle(params, name, str(value))))
+        if name != "price":
+            options.sort(key=lambda o: o.label.casefold())
+        facets[name] = options
+
+    facets["in_stock"] = FacetOption("In stock only", counts["in_stock"], filters.in_stock, _toggle(params, "in_stock", "1"))
+    return facets
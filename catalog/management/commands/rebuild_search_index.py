@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from catalog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the catalog tables."
+
+    def handle(self, *args, **opts):
+        backend = get_backend()
+        count = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} products ({type(backend).__name__})."))
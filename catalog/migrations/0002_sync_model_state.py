@@ -0,0 +1,52 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:44
+
+import cloudinary.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='brand',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='category',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='product',
+            options={},
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='brand',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='catalog.brand'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='catalog.category'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='description_te',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name_te',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+    ]
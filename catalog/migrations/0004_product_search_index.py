@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:50
+
+from django.db import migrations
+
+# catalog.search as of this migration, frozen: the tokenchars are the Telugu
+# combining marks plus ZWNJ/ZWJ
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_product_fts USING fts5("
+    "name, name_te, brand, category, description, description_te, "
+    "tokenize=\"unicode61 remove_diacritics 2 tokenchars '"
+    "\u0c00\u0c01\u0c02\u0c03\u0c04\u0c3c\u0c3e\u0c3f\u0c40\u0c41\u0c42\u0c43\u0c44"
+    "\u0c46\u0c47\u0c48\u0c4a\u0c4b\u0c4c\u0c4d\u0c55\u0c56\u0c62\u0c63\u200c\u200d"
+    "'\")"
+)
+
+FTS_POPULATE = """
+    INSERT INTO catalog_product_fts (rowid, name, name_te, brand, category, description, description_te)
+    SELECT p.id, p.name, COALESCE(p.name_te, ''),
+           b.name || ' ' || b.name_te, c.name || ' ' || c.name_te,
+           p.description, COALESCE(p.description_te, '')
+    FROM catalog_product p
+    JOIN catalog_brand b ON b.id = p.brand_id
+    JOIN catalog_category c ON c.id = p.category_id
+"""
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(FTS_DDL)
+    schema_editor.execute(FTS_POPULATE)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS catalog_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -4,6 +4,7 @@ from cloudinary.models import CloudinaryField
 
 class Brand(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    name_te = models.CharField(max_length=120, blank=True)
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
@@ -12,6 +13,7 @@ class Brand(models.Model):
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    name_te = models.CharField(max_length=120, blank=True)
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
@@ -38,5 +40,32 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Partial indexes over active products only, in keyset order
+        # (newest first), so listing pages never sort or skip inactive rows.
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="product_active_recent_idx",
+            ),
+            models.Index(
+                fields=["brand", "-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="product_brand_active_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at", "-id"],
+                condition=models.Q(is_active=True),
+                name="product_category_active_idx",
+            ),
+            # covers catalog.facets.facet_rows(), which reads only these columns
+            models.Index(
+                fields=["brand", "category", "price", "stock_quantity"],
+                condition=models.Q(is_active=True),
+                name="product_facets_active_idx",
+            ),
+        ]
+
     def __str__(self):
         return self.name
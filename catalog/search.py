@@ -0,0 +1,178 @@
+import unicodedata
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from core.pagination import KeysetPage
+from .models import Product
+
+FTS_TABLE = "catalog_product_fts"
+
+# Ranked search results beyond this are not paginated
+MAX_RESULTS = 500
+
+# unicode61 treats combining marks as separators, which would cut Telugu
+# words apart at every vowel sign / virama. Declare them (and ZWNJ/ZWJ)
+# as token characters instead.
+TELUGU_MARKS = "".join(
+    chr(cp) for cp in range(0x0C00, 0x0C80) if unicodedata.category(chr(cp)).startswith("M")
+) + "‌‍"
+
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, name_te, brand, category, description, description_te, "
+    f"tokenize=\"unicode61 remove_diacritics 2 tokenchars '{TELUGU_MARKS}'\")"
+)
+
+# bm25 column weights, in FTS_DDL column order: names matter most
+FTS_WEIGHTS = (10.0, 10.0, 4.0, 4.0, 1.0, 1.0)
+
+FTS_POPULATE = f"""
+    INSERT INTO {FTS_TABLE} (rowid, name, name_te, brand, category, description, description_te)
+    SELECT p.id, p.name, COALESCE(p.name_te, ''),
+           b.name || ' ' || b.name_te, c.name || ' ' || c.name_te,
+           p.description, COALESCE(p.description_te, '')
+    FROM catalog_product p
+    JOIN catalog_brand b ON b.id = p.brand_id
+    JOIN catalog_category c ON c.id = p.category_id
+"""
+
+
+def match_expression(q):
+    """User text -> FTS5 query: every word must match, the last one as a prefix."""
+    words = [w.replace('"', '""') for w in q.split()]
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+class BasicSearchBackend:
+    """LIKE-based fallback for databases without a full-text index."""
+
+    def ranked_ids(self, q, limit, offset=0, within=None):
+        words = q.split()
+        products = (Product.objects if within is None else within).filter(is_active=True)
+        for word in words:
+            products = products.filter(
+                Q(name__icontains=word)
+                | Q(name_te__icontains=word)
+                | Q(brand__name__icontains=word)
+                | Q(category__name__icontains=word)
+            )
+        return list(products.order_by("name", "id").values_list("id", flat=True)[offset:offset + limit])
+
+    def index_products(self, product_ids):
+        pass
+
+    def index_brand(self, brand_id):
+        pass
+
+    def index_category(self, category_id):
+        pass
+
+    def remove_products(self, product_ids):
+        pass
+
+    def rebuild(self):
+        return Product.objects.count()
+
+
+class SQLiteFTSBackend(BasicSearchBackend):
+    """SQLite FTS5 index over English + Telugu names/descriptions, brand and category."""
+
+    def ranked_ids(self, q, limit, offset=0, within=None):
+        expr = match_expression(q)
+        if not expr:
+            return []
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+
+        restrict, params = "", [expr]
+        if within is not None:
+            sub_sql, sub_params = within.values("id").query.sql_with_params()
+            restrict = f"AND p.id IN ({sub_sql}) "
+            params.extend(sub_params)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT f.rowid FROM {FTS_TABLE} f "
+                "JOIN catalog_product p ON p.id = f.rowid AND p.is_active "
+                f"WHERE {FTS_TABLE} MATCH %s {restrict}"
+                f"ORDER BY bm25({FTS_TABLE}, {weights}), f.rowid LIMIT %s OFFSET %s",
+                params + [limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def _reindex(self, where, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT p.id FROM catalog_product p WHERE {where})",
+                params,
+            )
+            cursor.execute(f"{FTS_POPULATE} WHERE {where}", params)
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if product_ids:
+            # a product that no longer exists only needs its old row removed
+            self.remove_products(product_ids)
+            placeholders = ", ".join(["%s"] * len(product_ids))
+            with connection.cursor() as cursor:
+                cursor.execute(f"{FTS_POPULATE} WHERE p.id IN ({placeholders})", product_ids)
+
+    def index_brand(self, brand_id):
+        self._reindex("p.brand_id = %s", [brand_id])
+
+    def index_category(self, category_id):
+        self._reindex("p.category_id = %s", [category_id])
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if product_ids:
+            placeholders = ", ".join(["%s"] * len(product_ids))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", product_ids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+            cursor.execute(FTS_DDL)
+            cursor.execute(FTS_POPULATE)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+
+def get_backend():
+    """
+    The FTS5 backend on SQLite. Other databases (Postgres via DATABASE_URL)
+    get BasicSearchBackend: unranked LIKE matching that scans the product
+    table, fine for a small catalog but not indexed.
+    """
+    if connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    return BasicSearchBackend()
+
+
+def search_page(queryset, q, cursor=None, per_page=24, within=None):
+    """
+    One page of queryset restricted to products matching q, best match
+    first. The cursor is the offset into the ranked result list.
+
+    within (a Product queryset, e.g. facet filters) narrows the ranking
+    itself, so filtered pages are still full pages.
+    """
+    try:
+        offset = max(0, min(int(cursor or 0), MAX_RESULTS))
+    except ValueError:
+        offset = 0
+
+    ids = get_backend().ranked_ids(q, min(per_page + 1, MAX_RESULTS - offset), offset, within)
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+    if not ids:
+        return KeysetPage([], None)
+
+    rank = Case(*[When(id=pid, then=pos) for pos, pid in enumerate(ids)], output_field=IntegerField())
+    products = list(queryset.filter(id__in=ids).order_by(rank))
+    return KeysetPage(products, str(offset + per_page) if has_next else None)
@@ -1,3 +1,391 @@
-from django.test import TestCase
+import time
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.pagination import keyset_paginate
+from core.testing import TEST_STORAGES, QueryBudgetMixin, seed_catalog
+from .cache import cache_stats, reset_stats
+from .facets import FacetFilters, facet_counts, facet_rows
+from .models import Brand, Category, Product
+from .typeahead import Suggestion, TypeaheadIndex, build_index
+from .version import bump_catalog_version
+
+
+def seed_products(n, brand=None, category=None, **fields):
+    brand = brand or Brand.objects.get_or_create(name="Cello")[0]
+    category = category or Category.objects.get_or_create(name="Pens")[0]
+    products = Product.objects.bulk_create([
+        Product(brand=brand, category=category, name=f"Pen {i}", price=Decimal("10.00"), **fields)
+        for i in range(n)
+    ])
+    # bulk_create sends no signals
+    bump_catalog_version()
+    return products
+
+
+class ProductListTests(TestCase):
+    def test_query_count_is_flat_in_catalog_size(self):
+        seed_products(5)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get("/products/")
+
+        seed_products(60, brand=Brand.objects.create(name="Doms"))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get("/products/")
+
+        self.assertEqual(len(small), len(large))
+        # page, facet counts, brand and category labels
+        self.assertEqual(len(large), 4)
+        self.assertEqual(len(response.context["products"]), 24)
+
+    def test_keyset_pages_cover_everything_once(self):
+        seed_products(50)
+        seed_products(3, is_active=False)
+
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get("/products/", {"after": cursor} if cursor else {})
+            page = response.context["page"]
+            seen.extend(p.id for p in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        active = Product.objects.filter(is_active=True)
+        self.assertEqual(len(seen), 50)
+        self.assertEqual(set(seen), set(active.values_list("id", flat=True)))
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        seed_products(3)
+        response = self.client.get("/products/", {"after": "not-a-cursor"})
+        self.assertEqual(len(response.context["products"]), 3)
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        reset_stats()
+        self.products = seed_products(3)
+
+    def test_anonymous_pages_are_served_from_cache_until_catalog_changes(self):
+        first = self.client.get("/products/")
+        with self.assertNumQueries(0):
+            second = self.client.get("/products/")
+        self.assertEqual(first.content, second.content)
+
+        self.products[0].name = "Gel Pen"
+        self.products[0].save()
+        self.assertContains(self.client.get("/products/"), "Gel Pen")
+
+        self.assertEqual(cache_stats()["page"], {"hits": 1, "misses": 2, "hit_ratio": 0.333})
+
+    def test_signed_in_users_reuse_cached_results_and_cards(self):
+        self.client.force_login(User.objects.create_user("ravi"))
+        self.client.get("/products/")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/products/")
+        # session + user only
+        self.assertEqual(len(queries), 2)
+        self.assertContains(response, "Pen 2")
+        # page, facet rows and facet labels
+        self.assertEqual(cache_stats()["results"]["hits"], 3)
+        self.assertEqual(cache_stats()["fragment"]["hits"], 1)
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.client.get("/")
+        self.client.get("/")
+        self.assertEqual(self.client.get("/products/cache-stats/").status_code, 302)
+
+        self.client.force_login(User.objects.create_user("owner", is_staff=True))
+        data = self.client.get("/products/cache-stats/").json()
+        self.assertEqual(data["stats"]["page"]["hits"], 1)
+
+
+# templates extending core/base.html need static files without a manifest
+STATIC_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=STATIC_STORAGES)
+class BrowseTests(TestCase):
+    def setUp(self):
+        self.cello = Brand.objects.create(name="Cello")
+        self.pens = Category.objects.create(name="Pens")
+        seed_products(30, brand=self.cello, category=self.pens, stock_quantity=5)
+        seed_products(2, brand=self.cello, category=self.pens, is_active=False)
+
+    def test_brand_and_category_counts_in_one_query(self):
+        doms = Brand.objects.create(name="Doms")
+        seed_products(4, brand=doms, category=Category.objects.create(name="Pencils"))
+        Brand.objects.create(name="Hidden", is_active=False)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/brands/")
+        counts = {b.name: (b.product_count, b.in_stock_count) for b in response.context["brands"]}
+        self.assertEqual(counts, {"Cello": (30, 30), "Doms": (4, 0)})
+
+        response = self.client.get("/categories/")
+        counts = {c.name: (c.product_count, c.in_stock_count) for c in response.context["categories"]}
+        self.assertEqual(counts, {"Pencils": (4, 0), "Pens": (30, 30)})
+
+    def test_brand_and_category_pages_are_keyset_paginated(self):
+        for url in (f"/brands/{self.cello.id}/", f"/categories/{self.pens.id}/"):
+            with self.assertNumQueries(2):
+                first = self.client.get(url)
+            page = first.context["page"]
+            self.assertEqual(len(page), 24)
+
+            second = self.client.get(url, {"after": page.next_cursor}).context["page"]
+            self.assertEqual(len(second), 6)
+            self.assertFalse(second.has_next)
+
+    def test_inactive_or_missing_objects_404(self):
+        hidden = Brand.objects.create(name="Hidden", is_active=False)
+        inactive = Product.objects.filter(is_active=False).first()
+        self.assertEqual(self.client.get(f"/brands/{hidden.id}/").status_code, 404)
+        self.assertEqual(self.client.get("/categories/999/").status_code, 404)
+        self.assertEqual(self.client.get(f"/products/{inactive.id}/").status_code, 404)
+
+    def test_product_detail(self):
+        product = Product.objects.filter(is_active=True).first()
+        response = self.client.get(f"/products/{product.id}/")
+        self.assertContains(response, product.name)
+        self.assertContains(response, "Cello")
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        self.cello = Brand.objects.create(name="Cello")
+        self.doms = Brand.objects.create(name="Doms")
+        self.pens = Category.objects.create(name="Pens")
+        self.pencils = Category.objects.create(name="Pencils")
+        for brand, category, name, price, stock in (
+            (self.cello, self.pens, "Gripper Pen", "10.00", 5),
+            (self.cello, self.pens, "Butterflow Pen", "60.00", 0),
+            (self.cello, self.pencils, "Cello Pencil", "5.00", 9),
+            (self.doms, self.pencils, "Doms Pencil", "8.00", 3),
+            (self.doms, self.pens, "Doms Pen", "120.00", 1),
+        ):
+            Product.objects.create(brand=brand, category=category, name=name, price=Decimal(price), stock_quantity=stock)
+
+    def names(self, **params):
+        response = self.client.get("/products/", params)
+        return sorted(p.name for p in response.context["products"]), response.context["facets"]
+
+    def test_counts_ignore_their_own_selection(self):
+        names, facets = self.names(brand=self.cello.id)
+        self.assertEqual(names, ["Butterflow Pen", "Cello Pencil", "Gripper Pen"])
+
+        brands = {o.label: (o.count, o.selected) for o in facets["brand"]}
+        self.assertEqual(brands, {"Cello": (3, True), "Doms": (2, False)})
+        categories = {o.label: o.count for o in facets["category"]}
+        self.assertEqual(categories, {"Pencils": 1, "Pens": 2})
+        prices = {o.label: o.count for o in facets["price"]}
+        self.assertEqual(prices, {"Under ₹50": 2, "₹50 – ₹100": 1})
+        self.assertEqual(facets["in_stock"].count, 2)
+
+    def test_combined_filters(self):
+        names, facets = self.names(brand=[self.cello.id, self.doms.id], category=self.pens.id, in_stock="1")
+        self.assertEqual(names, ["Doms Pen", "Gripper Pen"])
+        names, _ = self.names(price=["0-50", "100-250"], category=self.pens.id)
+        self.assertEqual(names, ["Doms Pen", "Gripper Pen"])
+        names, _ = self.names(price="nonsense", brand="x")
+        self.assertEqual(len(names), 5)
+
+    def test_facets_combine_with_search(self):
+        names, facets = self.names(q="pencil", brand=self.doms.id)
+        self.assertEqual(names, ["Doms Pencil"])
+        brands = {o.label: o.count for o in facets["brand"]}
+        self.assertEqual(brands, {"Cello": 1, "Doms": 1})
+        self.assertEqual([o.label for o in facets["category"]], ["Pencils"])
+
+    def test_counts_come_from_one_grouped_query(self):
+        with self.assertNumQueries(1):
+            rows = facet_rows(Product.objects.filter(is_active=True))
+        self.assertEqual(sum(row[-1] for row in rows), 5)
+
+        # any selection is answered from the same rows
+        filters = FacetFilters(frozenset(), frozenset({self.pencils.id}), frozenset(), True)
+        counts = facet_counts(rows, filters)
+        self.assertEqual(counts["brand"], {self.cello.id: 1, self.doms.id: 1})
+        self.assertEqual(counts["in_stock"], 2)
+
+    def test_toggle_links_keep_other_filters(self):
+        _, facets = self.names(q="pen", brand=self.cello.id, after="abc")
+        doms = next(o for o in facets["brand"] if o.label == "Doms")
+        self.assertEqual(doms.url, f"?brand={self.cello.id}&brand={self.doms.id}&q=pen")
+        cello = next(o for o in facets["brand"] if o.label == "Cello")
+        self.assertEqual(cello.url, "?q=pen")
+
+
+class KeysetPaginateTests(TestCase):
+    def test_ties_on_created_at_are_broken_by_id(self):
+        products = seed_products(7)
+        Product.objects.update(created_at=products[0].created_at)
+
+        first = keyset_paginate(Product.objects.all(), per_page=4)
+        second = keyset_paginate(Product.objects.all(), first.next_cursor, per_page=4)
+
+        ids = [p.id for p in first] + [p.id for p in second]
+        self.assertEqual(ids, sorted((p.id for p in products), reverse=True))
+        self.assertFalse(second.has_next)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.doms = Brand.objects.create(name="Doms", name_te="డామ్స్")
+        self.pencils = Category.objects.create(name="Pencils")
+        self.pencil = Product.objects.create(
+            brand=self.doms, category=self.pencils, name="Extra Dark Pencil",
+            name_te="ఎక్స్ట్రా డార్క్ పెన్సిల్", price=Decimal("5.00"),
+        )
+        self.eraser = Product.objects.create(
+            brand=self.doms, category=Category.objects.create(name="Erasers"),
+            name="Dust Free Eraser", description="Goes well with any pencil", price=Decimal("3.00"),
+        )
+
+    def search(self, q):
+        response = self.client.get("/products/", {"q": q})
+        return [p.name for p in response.context["products"]]
+
+    def test_name_match_ranks_above_description_match(self):
+        self.assertEqual(self.search("pencil"), ["Extra Dark Pencil", "Dust Free Eraser"])
+
+    def test_prefix_brand_and_telugu_matches(self):
+        self.assertEqual(self.search("extra da"), ["Extra Dark Pencil"])
+        self.assertEqual(self.search("పెన్సి"), ["Extra Dark Pencil"])
+        self.assertEqual(len(self.search("డామ్స్")), 2)
+        # a different vowel sign is a different word, not a match on the bare consonant
+        self.assertEqual(self.search("పా"), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.pencil.name = "Charcoal Pencil"
+        self.pencil.save()
+        self.assertEqual(self.search("charcoal"), ["Charcoal Pencil"])
+
+        self.doms.name = "DOMS India"
+        self.doms.save()
+        self.assertEqual(len(self.search("india")), 2)
+
+        self.eraser.delete()
+        self.assertEqual(self.search("eraser"), [])
+
+        # queryset.update() sends no signals, so the catalog version is bumped by hand
+        Product.objects.filter(id=self.pencil.id).update(is_active=False)
+        bump_catalog_version()
+        self.assertEqual(self.search("charcoal"), [])
+
+    def test_quotes_and_operators_are_literal(self):
+        self.assertEqual(self.search('pencil" OR "x'), [])
+        self.assertEqual(self.search("NOT"), [])
+
+    def test_rebuild_command(self):
+        seed_products(4)
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 6 products", out.getvalue())
+        self.assertEqual(len(self.search("cello")), 4)
+
+
+class TypeaheadIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = TypeaheadIndex([
+            Suggestion("product", 1, "Extra Dark Pencil"),
+            Suggestion("product", 1, "ఎక్స్ట్రా డార్క్ పెన్సిల్"),
+            Suggestion("product", 2, "Pencil Sharpener"),
+            Suggestion("brand", 3, "Doms"),
+            Suggestion("category", 4, "Pencils"),
+        ])
+
+    def test_name_start_ranks_before_inner_word(self):
+        labels = [s.label for s in self.index.lookup("penc")]
+        self.assertEqual(labels, ["Pencil Sharpener", "Pencils", "Extra Dark Pencil"])
+
+    def test_name_starts_survive_many_inner_word_matches(self):
+        index = TypeaheadIndex(
+            [Suggestion("product", i, f"USB Cable {i}") for i in range(100)]
+            + [Suggestion("brand", 100, "Casio"), Suggestion("product", 101, "Casio Calculator")]
+        )
+        labels = [s.label for s in index.lookup("ca")]
+        self.assertEqual(labels[:2], ["Casio Calculator", "Casio"])
+        self.assertEqual(len(labels), 8)
+
+    def test_case_multiword_and_telugu_prefixes(self):
+        self.assertEqual([s.id for s in self.index.lookup("DARK pe")], [1])
+        self.assertEqual([s.label for s in self.index.lookup("పెన్")], ["ఎక్స్ట్రా డార్క్ పెన్సిల్"])
+        self.assertEqual(self.index.lookup("   "), [])
+        self.assertEqual(self.index.lookup("zzz"), [])
+
+
+class AutocompleteViewTests(TestCase):
+    def setUp(self):
+        seed_products(3)
+        Product.objects.create(
+            brand=Brand.objects.create(name="Doms"), category=Category.objects.create(name="Pencils"),
+            name="Extra Dark Pencil", price=Decimal("5.00"),
+        )
+
+    def test_answers_from_memory_and_rebuilds_on_catalog_change(self):
+        self.client.get("/products/autocomplete/", {"q": "x"})  # warm this process's index
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/products/autocomplete/", {"q": "pen"})
+        labels = [r["label"] for r in response.json()["results"]]
+        self.assertEqual(labels[:3], ["Pen 0", "Pen 1", "Pen 2"])
+        self.assertIn("Extra Dark Pencil", labels)
+
+        Product.objects.filter(name="Pen 0").delete()
+        labels = [r["label"] for r in self.client.get("/products/autocomplete/", {"q": "pen"}).json()["results"]]
+        self.assertNotIn("Pen 0", labels)
+
+    def test_lookup_is_sub_millisecond(self):
+        index = build_index()
+        started = time.perf_counter()
+        for _ in range(1000):
+            index.lookup("pe")
+        self.assertLess((time.perf_counter() - started) / 1000, 0.001)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class CatalogQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.products = seed_catalog(30)
+        self.brand = self.products[0].brand
+        self.category = self.products[0].category
+
+    def grow(self):
+        seed_catalog(120, prefix="More")
+
+    def get(self, url, params=None):
+        return lambda: self.client.get(url, params or {})
+
+    def test_product_list(self):
+        # page, facet counts, brand and category labels
+        self.assertQueryBudget(self.get("/products/"), 4, grow=self.grow)
+        self.assertQueryBudget(self.get("/products/", {"brand": self.brand.id, "price": "0-50"}), 4, grow=self.grow)
+        # + ranked ids for the facets; the page is a ranked id query plus a fetch
+        self.assertQueryBudget(self.get("/products/", {"q": "pen", "in_stock": "1"}), 6, grow=self.grow)
+
+    def test_autocomplete(self):
+        # cold index: brands, categories, products
+        self.assertQueryBudget(self.get("/products/autocomplete/", {"q": "pe"}), 3, grow=self.grow)
+
+    def test_browse_pages(self):
+        self.assertQueryBudget(self.get("/brands/"), 1, grow=self.grow)
+        self.assertQueryBudget(self.get("/categories/"), 1, grow=self.grow)
+        self.assertQueryBudget(self.get(f"/brands/{self.brand.id}/"), 2, grow=self.grow)
+        self.assertQueryBudget(self.get(f"/categories/{self.category.id}/"), 2, grow=self.grow)
+        self.assertQueryBudget(self.get(f"/products/{self.products[0].id}/"), 1, grow=self.grow)
+
+    def test_cache_stats(self):
+        self.client.force_login(User.objects.create_user("owner", is_staff=True))
+        self.assertQueryBudget(self.get("/products/cache-stats/"), 2, grow=self.grow)
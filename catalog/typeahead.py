@@ -0,0 +1,106 @@
+import threading
+import unicodedata
+from bisect import bisect_left
+from typing import NamedTuple
+
+from .models import Brand, Category, Product
+from .version import get_catalog_version
+
+# Lower sorts first when results tie on match position
+KIND_ORDER = {"product": 0, "brand": 1, "category": 2}
+
+
+class Suggestion(NamedTuple):
+    kind: str
+    id: int
+    label: str
+
+
+def normalize(text):
+    return unicodedata.normalize("NFC", text or "").casefold().strip()
+
+
+class TypeaheadIndex:
+    """
+    Prefix index over catalog names: sorted arrays of every word-start
+    suffix of every name ("extra dark pencil", "dark pencil", "pencil"),
+    searched with bisect. Works the same for English and Telugu.
+
+    Keys are split into one array per rank tier -- whole names before
+    inner words, then products, brands, categories -- so a lookup fills
+    from the best tier first and a crowd of inner-word matches can never
+    push out a name that starts with the prefix.
+    """
+
+    def __init__(self, suggestions):
+        self.suggestions = list(suggestions)
+        tiers = {}
+        for ref, s in enumerate(self.suggestions):
+            words = normalize(s.label).split()
+            for pos in range(len(words)):
+                tiers.setdefault((pos > 0, KIND_ORDER[s.kind]), []).append((" ".join(words[pos:]), ref))
+        self._tiers = []
+        for tier in sorted(tiers):
+            pairs = sorted(tiers[tier])
+            self._tiers.append(([key for key, _ in pairs], [ref for _, ref in pairs]))
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def lookup(self, prefix, limit=8):
+        prefix = " ".join(normalize(prefix).split())
+        if not prefix:
+            return []
+
+        found = []
+        seen = set()
+        for keys, refs in self._tiers:
+            # within a tier, gather a few more than needed, then shortest first
+            hits = []
+            i = bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix) and len(hits) < limit * 4:
+                if refs[i] not in seen:
+                    seen.add(refs[i])
+                    hits.append(refs[i])
+                i += 1
+            hits.sort(key=lambda ref: (len(self.suggestions[ref].label), self.suggestions[ref].label))
+            found.extend(hits)
+            if len(found) >= limit:
+                break
+
+        return [self.suggestions[ref] for ref in found[:limit]]
+
+
+def build_index():
+    suggestions = []
+    for kind, model in (("brand", Brand), ("category", Category)):
+        for pk, name, name_te in model.objects.filter(is_active=True).values_list("id", "name", "name_te"):
+            suggestions.append(Suggestion(kind, pk, name))
+            if name_te:
+                suggestions.append(Suggestion(kind, pk, name_te))
+
+    products = Product.objects.filter(is_active=True).values_list("id", "name", "name_te")
+    for pk, name, name_te in products.iterator(chunk_size=2000):
+        suggestions.append(Suggestion("product", pk, name))
+        if name_te:
+            suggestions.append(Suggestion("product", pk, name_te))
+
+    return TypeaheadIndex(suggestions)
+
+
+_lock = threading.Lock()
+_state = {"version": None, "index": None}
+
+
+def get_index():
+    """
+    This process's index, rebuilt only when the catalog version moved.
+    The version check is a cache read; the database is queried on rebuild.
+    """
+    version = get_catalog_version()
+    if _state["version"] != version:
+        with _lock:
+            if _state["version"] != version:
+                _state["index"] = build_index()
+                _state["version"] = version
+    return _state["index"]
@@ -1,6 +1,16 @@
 from django.urls import path
-from .views import product_list
+from .views import (
+    brand_list, catalog_cache_stats, category_list, product_autocomplete, product_detail,
+    product_list, products_by_brand, products_by_category,
+)
 
 urlpatterns = [
     path("products/", product_list, name="product_list"),
+    path("products/<int:pk>/", product_detail, name="product_detail"),
+    path("products/autocomplete/", product_autocomplete, name="product_autocomplete"),
+    path("products/cache-stats/", catalog_cache_stats, name="catalog_cache_stats"),
+    path("brands/", brand_list, name="brand_list"),
+    path("brands/<int:brand_id>/", products_by_brand, name="products_by_brand"),
+    path("categories/", category_list, name="category_list"),
+    path("categories/<int:category_id>/", products_by_category, name="products_by_category"),
 ]
@@ -0,0 +1,34 @@
+import time
+
+from django.core.cache import caches
+
+CACHE_ALIAS = "catalog"
+VERSION_KEY = "catalog:version"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_catalog_version():
+    """
+    Current catalog version. Anything derived from catalog tables (search
+    suggestions, cached pages) is valid only for the version it was built
+    from.
+    """
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # seed from the clock so a wiped cache never reuses an old number
+        cache.add(VERSION_KEY, time.time_ns() // 1000)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache = _cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        get_catalog_version()
+        return cache.incr(VERSION_KEY)
@@ -1,25 +1,154 @@
-from django.shortcuts import render
-from django.db.models import Q
-from .models import Product
+import os
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.cache import cache_control
 
+from core.pagination import keyset_paginate
+from .cache import cache_catalog_page, cache_stats, get_or_compute
+from .facets import FacetFilters, build_facets, facet_counts, facet_labels, facet_rows
+from .models import Brand, Category, Product
+from .search import MAX_RESULTS, get_backend, search_page
+from .typeahead import get_index
+from .version import get_catalog_version
+
+PRODUCTS_PER_PAGE = 24
+
+
+def _facet_rows(q):
+    products = Product.objects.filter(is_active=True)
+    if q:
+        products = products.filter(id__in=get_backend().ranked_ids(q, MAX_RESULTS))
+    return facet_rows(products)
+
+
+@cache_catalog_page
 def product_list(request):
     q = (request.GET.get("q") or "").strip()
+    after = request.GET.get("after")
+    filters = FacetFilters.from_params(request.GET)
 
-    products = Product.objects.all()
+    def compute():
+        products = Product.objects.filter(is_active=True).select_related("brand", "category")
+        filtered = products.filter(filters.as_q()) if filters else products
+        if q:
+            # ranked full-text search (English + Telugu, brand, category)
+            return search_page(products, q, after, per_page=PRODUCTS_PER_PAGE, within=filtered if filters else None)
+        return keyset_paginate(filtered, after, per_page=PRODUCTS_PER_PAGE)
 
-    # If your Product model has is_active, filter safely
-    if hasattr(Product, "is_active"):
-        products = products.filter(is_active=True)
+    page = get_or_compute("results", ("product_list", q, filters.key, after), compute)
 
-    if q:
-        products = products.filter(
-            Q(name__icontains=q)
-            | Q(brand__name__icontains=q)
-            | Q(category__name__icontains=q)
-        )
+    # facet rows depend only on q; every selection is summed from them
+    rows = get_or_compute("results", ("facet_rows", q), lambda: _facet_rows(q))
+    labels = get_or_compute("results", ("facet_labels",), facet_labels)
+    facets = build_facets(request.GET, filters, facet_counts(rows, filters), labels)
+
+    params = request.GET.copy()
+    params.pop("after", None)
 
     return render(request, "catalog/product_list.html", {
-        "products": products,
+        "products": page,
+        "page": page,
         "q": q,
+        "facets": facets,
+        "filters": filters,
+        "page_query": params.urlencode(),
+        "catalog_version": get_catalog_version(),
+    })
+
+
+def with_product_counts(queryset):
+    """
+    Active and in-stock product counts per brand/category, computed in the
+    same query as the list itself (one LEFT JOIN + GROUP BY).
+    """
+    active = Q(product__is_active=True)
+    return queryset.filter(is_active=True).annotate(
+        product_count=Count("product", filter=active),
+        in_stock_count=Count("product", filter=active & Q(product__stock_quantity__gt=0)),
+    ).order_by("name")
+
+
+@cache_catalog_page
+def brand_list(request):
+    brands = get_or_compute("results", ("brand_list",), lambda: list(with_product_counts(Brand.objects)))
+    return render(request, "catalog/brand_list.html", {"brands": brands})
+
+
+@cache_catalog_page
+def category_list(request):
+    categories = get_or_compute("results", ("category_list",), lambda: list(with_product_counts(Category.objects)))
+    return render(request, "catalog/category_list.html", {"categories": categories})
+
+
+@cache_catalog_page
+def products_by_brand(request, brand_id):
+    after = request.GET.get("after")
+
+    def compute():
+        brand = get_object_or_404(Brand, id=brand_id, is_active=True)
+        products = Product.objects.filter(brand=brand, is_active=True).select_related("category")
+        return brand, keyset_paginate(products, after, per_page=PRODUCTS_PER_PAGE)
+
+    brand, page = get_or_compute("results", ("products_by_brand", brand_id, after), compute)
+    return render(request, "catalog/products_by_brand.html", {
+        "brand": brand,
+        "products": page,
+        "page": page,
+    })
+
+
+@cache_catalog_page
+def products_by_category(request, category_id):
+    after = request.GET.get("after")
+
+    def compute():
+        category = get_object_or_404(Category, id=category_id, is_active=True)
+        products = Product.objects.filter(category=category, is_active=True).select_related("brand")
+        return category, keyset_paginate(products, after, per_page=PRODUCTS_PER_PAGE)
+
+    category, page = get_or_compute("results", ("products_by_category", category_id, after), compute)
+    return render(request, "catalog/products_by_category.html", {
+        "category": category,
+        "products": page,
+        "page": page,
+    })
+
+
+@cache_catalog_page
+def product_detail(request, pk):
+    product = get_or_compute("results", ("product_detail", pk), lambda: get_object_or_404(
+        Product.objects.select_related("brand", "category"), pk=pk, is_active=True,
+    ))
+    return render(request, "catalog/product_detail.html", {"product": product})
+
+
+@cache_control(max_age=60)
+def product_autocomplete(request):
+    q = (request.GET.get("q") or "").strip()
+    list_url = reverse("product_list")
+
+    results = [
+        {
+            "type": s.kind,
+            "id": s.id,
+            "label": s.label,
+            "url": f"{list_url}?{urlencode({'q': s.label})}",
+        }
+        for s in get_index().lookup(q[:100])
+    ]
+    return JsonResponse({"q": q, "results": results})
+
+
+@staff_member_required
+def catalog_cache_stats(request):
+    """Hit/miss counters of the catalog cache in this worker process."""
+    return JsonResponse({
+        "pid": os.getpid(),
+        "version": get_catalog_version(),
+        "stats": cache_stats(),
     })
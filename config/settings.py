@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from .database import database_config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # -------------------------
@@ -39,11 +41,16 @@ MIDDLEWARE = [
     # WhiteNoise (static files)
     "whitenoise.middleware.WhiteNoiseMiddleware",
 
+    # Server-Timing header + one log line per request (after WhiteNoise,
+    # so static files are not logged)
+    "core.timing.ServerTimingMiddleware",
+
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "orders.middleware.CartMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -51,7 +58,8 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates that reports render time to core.timing
+        "BACKEND": "core.timing.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -68,13 +76,11 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 
 # -------------------------
-# Database (SQLite is OK for demo)
+# Database: tuned SQLite by default, Postgres with DATABASE_URL
+# (see config/database.py)
 # -------------------------
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_config(BASE_DIR),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -103,6 +109,13 @@ STORAGES = {
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
+    # Rendered invoice PDFs (a cache; safe to wipe)
+    "invoices": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.environ.get("INVOICE_CACHE_DIR", BASE_DIR / "var" / "invoices"),
+        },
+    },
 }
 
 # -------------------------
@@ -113,6 +126,99 @@ STORAGES = {
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# -------------------------
+# Caches
+# -------------------------
+# "catalog" holds the catalog version plus the page, search-result and
+# fragment caches keyed on it. CATALOG_CACHE=file (default) is shared by all
+# workers on the host, so one process bumping the version is seen by the
+# others; locmem is per process and only suits a single worker or tests.
+CATALOG_CACHE = os.environ.get("CATALOG_CACHE", "file")
+CATALOG_CACHE_TIMEOUT = int(os.environ.get("CATALOG_CACHE_TIMEOUT", "300"))
+
+CATALOG_CACHE_BACKENDS = {
+    "file": {
+        "BACKEND": "catalog.cache.FileCatalogCache",
+        "LOCATION": os.environ.get("CATALOG_CACHE_DIR", BASE_DIR / "var" / "cache" / "catalog"),
+    },
+    "locmem": {
+        "BACKEND": "catalog.cache.LocMemCatalogCache",
+        "LOCATION": "catalog",
+    },
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": {
+        **CATALOG_CACHE_BACKENDS[CATALOG_CACHE],
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 3000},
+    },
+}
+
+# Tests swap in a per-process locmem "catalog" cache (see core.runner)
+TEST_RUNNER = "core.runner.TestRunner"
+
+# -------------------------
+# Cart
+# -------------------------
+# "cookie": small carts in a signed cookie, large ones in the session;
+# "session": always in the session (one session row write per cart change)
+CART_STORE = os.environ.get("CART_STORE", "cookie")
+
+# -------------------------
+# Orders
+# -------------------------
+# Shop's WhatsApp number that new-order messages are addressed to
+WHATSAPP_ORDER_NUMBER = os.environ.get("WHATSAPP_ORDER_NUMBER", "+91 9440574394")
+# Who sends the outbox's WhatsApp notifications (see orders.notifications.SENDERS):
+# "log" writes them to the log, "locmem" keeps them in memory for tests
+NOTIFICATION_SENDER = os.environ.get("NOTIFICATION_SENDER", "log")
+
+# -------------------------
+# Invoices
+# -------------------------
+# TTF with a "₹" glyph (a -Bold.ttf beside it is used for bold); defaults to
+# the DejaVu Sans shipped in orders/fonts
+INVOICE_FONT_PATH = os.environ.get("INVOICE_FONT_PATH", str(BASE_DIR / "orders" / "fonts" / "DejaVuSans.ttf"))
+
+# -------------------------
+# Request timing / logging
+# -------------------------
+# The header shows query counts and timings to whoever made the request, so
+# it is off in production unless switched on; the log line is always written
+SERVER_TIMING_HEADER = os.environ.get("SERVER_TIMING_HEADER", str(DEBUG)).lower() == "true"
+# Requests over either threshold are logged at WARNING with slow=1
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_QUERIES = int(os.environ.get("SLOW_REQUEST_QUERIES", "30"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "loggers": {
+        "core.timing": {
+            "handlers": ["console"],
+            # WARNING logs slow requests only; INFO logs every request
+            "level": os.environ.get("REQUEST_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+        "orders.notifications": {
+            "handlers": ["console"],
+            # INFO shows what the "log" sender would have sent
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 # -------------------------
 # Security on Render
 # -------------------------
@@ -0,0 +1,204 @@
+"""
+Simulated shoppers for the loadtest command.
+
+Each shopper browses and searches anonymously, then, logged in, fills a cart
+through the cart API, checks out and downloads the invoice. Requests go
+in-process through the test client, or over HTTP to a running server.
+"""
+import http.cookiejar
+import math
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode
+
+from django.db import connections
+from django.test import Client
+
+STEPS = ("browse", "product", "search", "add_to_cart", "checkout_form", "checkout", "order_success", "invoice")
+
+_ORDER_URL = re.compile(r"/order/success/(\d+)/")
+
+
+class ClientSession:
+    """Requests through django.test.Client, in this process."""
+
+    def __init__(self, user=None):
+        # a 500 is a result to count, not an exception to stop the run
+        self.client = Client(HTTP_HOST="localhost", raise_request_exception=False)
+        if user is not None:
+            self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        send = self.client.get if method == "GET" else self.client.post
+        response = send(path, data)
+        return response.status_code, response.get("Location", "")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """Requests to a running server, with a cookie jar and CSRF token of its own."""
+
+    def __init__(self, base_url, username=None, password=None):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+        if username is not None:
+            self.request("GET", "/accounts/login/")
+            status, _ = self.request("POST", "/accounts/login/", {"username": username, "password": password})
+            if status != 302:
+                raise RuntimeError(f"Logging in as {username} failed with {status}.")
+
+    def _csrf_token(self):
+        return next((c.value for c in self.cookies if c.name == "csrftoken"), "")
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        headers = {"Referer": url}
+        body = None
+        if method == "GET":
+            if data:
+                url += "?" + urlencode(data)
+        else:
+            token = self._csrf_token()
+            headers["X-CSRFToken"] = token
+            body = urlencode({**(data or {}), "csrfmiddlewaretoken": token}).encode()
+
+        try:
+            with self.opener.open(urllib.request.Request(url, body, headers, method=method), timeout=30) as response:
+                response.read()
+                return response.status, ""
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get("Location", "")
+
+
+class Shopper:
+    def __init__(self, anonymous, customer, products, words, lines, rng):
+        self.anonymous = anonymous
+        self.customer = customer
+        self.products = products
+        self.words = words
+        self.lines = lines
+        self.rng = rng
+        self.samples = []  # (step, ms, ok)
+
+    def _step(self, step, session, method, path, data=None, expect=200):
+        started = time.perf_counter()
+        status, location = session.request(method, path, data)
+        self.samples.append((step, (time.perf_counter() - started) * 1000, status == expect))
+        return status, location
+
+    def journey(self):
+        product = self.rng.choice(self.products)
+        self._step("browse", self.anonymous, "GET", "/products/")
+        self._step("product", self.anonymous, "GET", f"/products/{product}/")
+        self._step("search", self.anonymous, "GET", "/products/", {"q": self.rng.choice(self.words)})
+
+        for pid in self.rng.sample(self.products, self.lines):
+            self._step("add_to_cart", self.customer, "POST", f"/cart/api/add/{pid}/")
+        self._step("checkout_form", self.customer, "GET", "/checkout/")
+        _, location = self._step("checkout", self.customer, "POST", "/checkout/", {
+            "fulfillment": "pickup", "phone": "9440574394", "whatsapp": "9440574394", "address": "Namdevada",
+        }, expect=302)
+
+        # out of stock sends the shopper back to the cart; nothing to invoice
+        match = _ORDER_URL.search(location)
+        if match is None:
+            return
+        order_id = int(match.group(1))
+        self._step("order_success", self.customer, "GET", f"/order/success/{order_id}/")
+        self._step("invoice", self.customer, "GET", f"/order/{order_id}/invoice/pdf/")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(samples, elapsed, journeys):
+    steps = {}
+    for step in STEPS:
+        timings = sorted(ms for name, ms, _ in samples if name == step)
+        if not timings:
+            continue
+        steps[step] = {
+            "requests": len(timings),
+            "errors": sum(1 for name, _, ok in samples if name == step and not ok),
+            "mean_ms": round(sum(timings) / len(timings), 2),
+            "p50_ms": round(percentile(timings, 50), 2),
+            "p95_ms": round(percentile(timings, 95), 2),
+            "p99_ms": round(percentile(timings, 99), 2),
+        }
+    return {
+        "seconds": round(elapsed, 3),
+        "journeys": journeys,
+        "journeys_per_second": round(journeys / elapsed, 2),
+        "requests_per_second": round(len(samples) / elapsed, 2),
+        "steps": steps,
+    }
+
+
+def run(make_shopper, shoppers, journeys, warmup=1):
+    """
+    Run `journeys` measured journeys (after `warmup` unmeasured ones) on each
+    of `shoppers` threads and summarize the measured ones per step.
+    """
+    results = []
+    failures = []
+    lock = threading.Lock()
+    start = threading.Barrier(shoppers + 1)
+
+    def work(index):
+        try:
+            shopper = make_shopper(index)
+            for _ in range(warmup):
+                shopper.journey()
+            shopper.samples.clear()
+            start.wait()
+            for _ in range(journeys):
+                shopper.journey()
+            with lock:
+                results.append(shopper)
+        except Exception as e:
+            start.abort()
+            failures.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(shoppers)]
+    for t in threads:
+        t.start()
+    try:
+        start.wait()
+    except threading.BrokenBarrierError:
+        pass
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if failures:
+        raise failures[0]
+
+    samples = [s for shopper in results for s in shopper.samples]
+    return summarize(samples, elapsed, journeys * len(results))
+
+
+def compare(current, baseline, tolerance):
+    """Regressions of current against baseline: p95 up, or throughput down, by more than tolerance."""
+    regressions = []
+    for step, stats in current["steps"].items():
+        before = baseline["steps"].get(step)
+        if before and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{step} p95 {before['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms")
+    if current["requests_per_second"] < baseline["requests_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"throughput {baseline['requests_per_second']:.1f} -> {current['requests_per_second']:.1f} req/s"
+        )
+    return regressions
@@ -0,0 +1,115 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+
+from catalog.models import Product
+from orders.models import Order
+from orders.stock import reserve_stock
+
+# What settings.DATABASES used before config/database.py
+BARE_OPTIONS = {}
+
+
+def _init_worker(name, options):
+    # each process talks to its own connection on the benchmark copy
+    settings.DATABASES["default"].update(NAME=name, OPTIONS=options, CONN_MAX_AGE=None)
+    django.setup()
+
+
+def _work(job):
+    """Mix reads and checkout-shaped writes for `seconds`; return (op, ms, ok) samples."""
+    seconds, write_ratio, seed, user_id, product_ids = job
+    rng = random.Random(seed)
+    samples = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if write:
+                # read, then write, in one transaction: the shape that fails
+                # immediately under deferred transactions when another
+                # process is writing
+                with transaction.atomic():
+                    product = Product.objects.get(id=rng.choice(product_ids))
+                    reserve_stock({product.id: 1})
+                    Order.objects.create(
+                        user_id=user_id, phone="9440574394", whatsapp="9440574394", total=product.price,
+                    )
+            else:
+                products = list(Product.objects.filter(is_active=True).select_related("brand")[:24])
+                Product.objects.filter(id__in=[p.id for p in products]).count()
+            ok = True
+        except OperationalError:  # "database is locked"
+            ok = False
+        samples.append(("write" if write else "read", (time.perf_counter() - started) * 1000, ok))
+    connections.close_all()
+    return samples
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent readers and checkout writers in separate processes (like gunicorn workers) on a "
+        "copy of the SQLite database, with the bare and the configured connection options."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=8, help="Concurrent processes")
+        parser.add_argument("--seconds", type=float, default=5, help="Run time per configuration")
+        parser.add_argument("--write-ratio", type=float, default=0.2, help="Share of operations that write")
+
+    def handle(self, *args, **opts):
+        db = settings.DATABASES["default"]
+        if db["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("bench_db compares SQLite configurations; DATABASES['default'] is not SQLite.")
+
+        for label, options in (("bare", BARE_OPTIONS), ("configured", db.get("OPTIONS", {}))):
+            with tempfile.TemporaryDirectory() as tmp:
+                name = os.path.join(tmp, "bench.sqlite3")
+                self.copy_database(db["NAME"], name)
+                self.run(label, name, options, opts)
+
+    def copy_database(self, source, target):
+        connections.close_all()
+        with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+            # WAL is a property of the file; start every configuration from rollback journaling
+            dst.execute("PRAGMA journal_mode=DELETE")
+
+    def run(self, label, name, options, opts):
+        # the copy is a separate database; query it through its own connection settings
+        with closing(sqlite3.connect(name)) as conn:
+            user_id = conn.execute("SELECT id FROM auth_user ORDER BY id LIMIT 1").fetchone()
+            product_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM catalog_product WHERE is_active AND stock_quantity > 0 LIMIT 200"
+            )]
+        if user_id is None or not product_ids:
+            raise CommandError("Needs at least one user and one product in stock.")
+
+        jobs = [
+            (opts["seconds"], opts["write_ratio"], i, user_id[0], product_ids)
+            for i in range(opts["processes"])
+        ]
+        with ProcessPoolExecutor(opts["processes"], initializer=_init_worker, initargs=(name, options)) as pool:
+            samples = [s for result in pool.map(_work, jobs) for s in result]
+
+        for op in ("read", "write"):
+            timings = sorted(ms for kind, ms, _ in samples if kind == op)
+            failed = sum(1 for kind, _, ok in samples if kind == op and not ok)
+            if not timings:
+                continue
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            self.stdout.write(
+                f"{label:>10} {op:>5}: {(len(timings) - failed) / opts['seconds']:8.1f} ok/sec, {failed:5} locked, "
+                f"mean {statistics.mean(timings):6.2f} ms, p95 {p95:7.2f} ms"
+            )
@@ -0,0 +1,98 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: what one gunicorn worker pays before and on
+# its first requests. Prints a JSON line of timings in ms.
+PROBE = r"""
+import io, json, sys, time
+
+started = time.perf_counter()
+from config.wsgi import application
+timings = {"import": time.perf_counter() - started, "reportlab": "reportlab" in sys.modules}
+
+from django.conf import settings
+# every request misses, so first and repeat requests do the same work
+settings.CACHES["catalog"] = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+if sys.argv[1] == "warm":
+    from core.warmup import warm_up
+    started = time.perf_counter()
+    warm_up()
+    timings["warm_up"] = time.perf_counter() - started
+
+
+def get(path):
+    environ = {
+        "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+        "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost",
+        "wsgi.url_scheme": "http", "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+    }
+    status = []
+    started = time.perf_counter()
+    b"".join(application(environ, lambda s, headers, exc_info=None: status.append(s)))
+    elapsed = time.perf_counter() - started
+    if not status[0].startswith("200"):
+        sys.exit(f"GET {path}: {status[0]}")
+    return elapsed
+
+
+for path in sys.argv[2:]:
+    timings[path] = [get(path), get(path)]
+
+print(json.dumps({k: [t * 1000 for t in v] if isinstance(v, list) else v * 1000 if isinstance(v, float) else v
+                  for k, v in timings.items()}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure worker startup in fresh processes: import time, warm_up(), and the first and a repeat "
+        "request to each URL, with and without the warm-up gunicorn.conf.py runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode (medians are reported)")
+        parser.add_argument("--url", action="append", help="Path to request (repeatable)")
+
+    def handle(self, *args, **opts):
+        paths = opts["url"] or ["/", "/products/", "/accounts/login/"]
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings")}
+
+        results = {}
+        for mode in ("cold", "warm"):
+            runs = []
+            for _ in range(opts["runs"]):
+                started = time.perf_counter()
+                proc = subprocess.run(
+                    [sys.executable, "-c", PROBE, mode, *paths],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+                )
+                if proc.returncode:
+                    raise CommandError(proc.stderr.strip().splitlines()[-1])
+                run = json.loads(proc.stdout.splitlines()[-1])
+                run["process"] = (time.perf_counter() - started) * 1000
+                runs.append(run)
+            results[mode] = runs
+
+        def median(mode, key, index=None):
+            return statistics.median(r[key] if index is None else r[key][index] for r in results[mode])
+
+        cold = results["cold"][0]
+        self.stdout.write(
+            f"import config.wsgi: {median('cold', 'import'):.0f} ms "
+            f"(reportlab {'loaded' if cold['reportlab'] else 'not loaded'}), "
+            f"whole process: {median('cold', 'process'):.0f} ms, warm_up(): {median('warm', 'warm_up'):.0f} ms"
+        )
+        self.stdout.write(f"{'':<20}{'first':>10}{'first, warmed':>15}{'repeat':>10}  (ms, median of {opts['runs']})")
+        for path in paths:
+            self.stdout.write(
+                f"{path:<20}{median('cold', path, 0):>10.1f}{median('warm', path, 0):>15.1f}"
+                f"{median('cold', path, 1):>10.1f}"
+            )
@@ -0,0 +1,186 @@
+import json
+import os
+import random
+import re
+import secrets
+import sqlite3
+import tempfile
+from contextlib import closing, contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import F, Sum
+from django.test import override_settings
+
+from catalog.models import Product
+from catalog.version import bump_catalog_version
+from core import loadtest
+from orders import invoices
+from orders.models import Order, OrderItem
+
+# A fresh prefix per run, so no existing account is reused or deleted
+USERNAME = "loadtest-{run}-{index}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent simulated shoppers (browse, search, cart, checkout, invoice), in-process on a throwaway "
+        "copy of the SQLite database, or against --url. Reports throughput and p50/p95/p99 per step."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--shoppers", type=int, default=4, help="Concurrent shoppers (threads)")
+        parser.add_argument("--journeys", type=int, default=10, help="Measured journeys per shopper")
+        parser.add_argument("--warmup", type=int, default=1, help="Unmeasured journeys per shopper first")
+        parser.add_argument("--lines", type=int, default=3, help="Products added to each cart")
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server using this database, ideally a scratch copy with no drain_outbox "
+                 "running (default: in-process). The shoppers, their orders and the stock they took are "
+                 "removed again afterwards.",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for product and search choices")
+        parser.add_argument("--json", dest="json_path", help="Write the results as JSON to this path")
+        parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Allowed p95 increase / throughput drop against --baseline (0.2 = 20%%)")
+
+    def handle(self, *args, **opts):
+        if opts["url"]:
+            self.simulate(opts)
+        else:
+            with self.scratch_copy():
+                self.simulate(opts)
+
+    @contextmanager
+    def scratch_copy(self):
+        """
+        Point this process at a copy of the database, with its own invoice
+        storage and catalog cache and no notification sender, for the
+        duration: nothing the shoppers do reaches the real shop.
+        """
+        db = settings.DATABASES["default"]
+        if db["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError(
+                "The in-process loadtest runs on a copy of the SQLite database; DATABASES['default'] is not "
+                "SQLite. Use --url against a server on a scratch database instead."
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            name = os.path.join(tmp, "loadtest.sqlite3")
+            connections.close_all()
+            with closing(sqlite3.connect(db["NAME"])) as src, closing(sqlite3.connect(name)) as dst:
+                src.backup(dst)
+
+            original = db["NAME"]
+            # as the test runner does: every new connection, in any thread, opens the copy
+            db["NAME"] = name
+            try:
+                with override_settings(
+                    STORAGES={
+                        **settings.STORAGES,
+                        "invoices": {
+                            "BACKEND": "django.core.files.storage.FileSystemStorage",
+                            "OPTIONS": {"location": os.path.join(tmp, "invoices")},
+                        },
+                    },
+                    CACHES={
+                        **settings.CACHES,
+                        "catalog": {
+                            **settings.CACHES["catalog"], **settings.CATALOG_CACHE_BACKENDS["locmem"],
+                            "LOCATION": "loadtest",
+                        },
+                    },
+                    NOTIFICATION_SENDER="locmem",
+                ):
+                    yield
+            finally:
+                connections.close_all()
+                db["NAME"] = original
+
+    def simulate(self, opts):
+        # well-stocked products, so stock running out doesn't skew checkout
+        product_ids = sorted(
+            Product.objects.filter(is_active=True, stock_quantity__gt=0)
+            .order_by("-stock_quantity", "id")
+            .values_list("id", flat=True)[:200]
+        )
+        if len(product_ids) < opts["lines"]:
+            raise CommandError(f"Needs at least {opts['lines']} active products in stock.")
+        names = Product.objects.filter(id__in=product_ids).values_list("name", flat=True)
+        words = sorted({w.lower() for name in names for w in re.findall(r"[^\W\d_]{3,}", name)}) or ["pen"]
+
+        password = secrets.token_urlsafe(12)
+        run = secrets.token_hex(4)
+        users = [
+            User.objects.create_user(USERNAME.format(run=run, index=i), password=password if opts["url"] else None)
+            for i in range(opts["shoppers"])
+        ]
+
+        def make_shopper(index):
+            if opts["url"]:
+                anonymous = loadtest.HttpSession(opts["url"])
+                customer = loadtest.HttpSession(opts["url"], users[index].username, password)
+            else:
+                anonymous = loadtest.ClientSession()
+                customer = loadtest.ClientSession(users[index])
+            rng = random.Random(f"{opts['seed']}-{index}")
+            return loadtest.Shopper(anonymous, customer, product_ids, words, opts["lines"], rng)
+
+        try:
+            results = loadtest.run(make_shopper, opts["shoppers"], opts["journeys"], opts["warmup"])
+        finally:
+            # the scratch copy is thrown away whole
+            if opts["url"]:
+                self.clean_up(users)
+
+        results["config"] = {
+            key: opts[key] for key in ("shoppers", "journeys", "warmup", "lines", "url", "seed")
+        }
+        self.report(results)
+
+        if opts["json_path"]:
+            with open(opts["json_path"], "w") as fh:
+                json.dump(results, fh, indent=2)
+
+        if opts["baseline"]:
+            with open(opts["baseline"]) as fh:
+                baseline = json.load(fh)
+            regressions = loadtest.compare(results, baseline, opts["tolerance"])
+            if regressions:
+                raise CommandError("Regressed against the baseline: " + "; ".join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"Within {opts['tolerance']:.0%} of the baseline."))
+
+    def clean_up(self, users):
+        """
+        Remove the users this run created, with their orders, and give back
+        the stock those orders took; sales and restocks made meanwhile stay.
+        """
+        taken = (
+            OrderItem.objects.filter(order__user__in=users)
+            .values_list("product_id")
+            .annotate(qty=Sum("qty"))
+        )
+        for product_id, qty in taken:
+            Product.objects.filter(id=product_id).update(stock_quantity=F("stock_quantity") + qty)
+        # update() sends no signals
+        bump_catalog_version()
+
+        for order_id in Order.objects.filter(user__in=users).values_list("id", flat=True):
+            invoices.delete_artifacts(order_id)
+        # their orders, profiles and queued notifications go with them
+        User.objects.filter(id__in=[u.id for u in users]).delete()
+
+    def report(self, results):
+        self.stdout.write(f"{'step':<14}{'requests':>9}{'errors':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+        for step, s in results["steps"].items():
+            self.stdout.write(
+                f"{step:<14}{s['requests']:>9}{s['errors']:>8}{s['mean_ms']:>9.1f}"
+                f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}"
+            )
+        self.stdout.write(
+            f"{results['journeys']} journeys in {results['seconds']:.1f} s: "
+            f"{results['journeys_per_second']:.1f} journeys/s, {results['requests_per_second']:.1f} requests/s"
+        )
@@ -0,0 +1,106 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _encode(values):
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode(cursor, fields):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(fields):
+            return None
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (binascii.Error, ValueError, TypeError, ValidationError):
+        return None
+
+
+def _after(ordering, values):
+    """
+    Q for rows strictly after values in ordering, e.g. for (-created_at, -id):
+    created_at <= v0 AND (created_at < v0 OR (created_at = v0 AND id < v1))
+
+    The leading inclusive bound is redundant logically but lets the planner
+    use it as an index range instead of OR-ing two scans and sorting.
+    """
+    condition = Q()
+    equal = Q()
+    for name, value in zip(ordering, values):
+        desc = name.startswith("-")
+        name = name.lstrip("-")
+        lookup = f"{name}__lt" if desc else f"{name}__gt"
+        condition |= equal & Q(**{lookup: value})
+        equal &= Q(**{name: value})
+
+    first = ordering[0]
+    bound = f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}"
+    return Q(**{bound: values[0]}) & condition
+
+
+def keyset_paginate(queryset, cursor=None, per_page=24, ordering=("-created_at", "-id")):
+    """
+    Cursor ("seek") pagination: every page is an index range scan, so page
+    200 costs the same as page 1, unlike OFFSET. The last field of ordering
+    must be unique (normally the primary key).
+    """
+    model = queryset.model
+    names = [name.lstrip("-") for name in ordering]
+    fields = [model._meta.get_field(name) for name in names]
+
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = _decode(cursor, fields)
+        if values is not None:
+            queryset = queryset.filter(_after(ordering, values))
+
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = _encode([field.value_to_string(last) for field in fields])
+
+    return KeysetPage(rows, next_cursor)
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginator whose count stops at count_cap: COUNT(*) over a large table
+    reads every row, counting at most count_cap rows reads at most that
+    many. Pages past the cap are not linked; filters narrow the list
+    instead. Use with ModelAdmin.show_full_result_count = False.
+    """
+
+    count_cap = 10_000
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, "order_by"):
+            return super().count
+        # ORDER BY would make the database sort the whole table first
+        return self.object_list.order_by()[:self.count_cap].count()
@@ -0,0 +1,87 @@
+"""
+Phone numbers normalized for search.
+
+Each searchable phone field <name> has two indexed companions kept in sync
+on save: <name>_digits, the national number ("+91 94405 74394" and
+"09440574394" both become "9440574394"), and <name>_digits_rev, the same
+digits reversed. A prefix of either is an index range scan, so staff can
+find a caller by the first or the last few digits.
+"""
+import re
+
+from django.db.models import Q
+
+COUNTRY_CODE = "91"
+NATIONAL_LENGTH = 10
+
+# Fewer digits than this match too many orders to be worth a lookup
+MIN_SEARCH_DIGITS = 4
+
+# What a typed phone number may contain: digits, +, spaces, dashes, dots, parentheses
+_PHONE_INPUT = re.compile(r"\+?[\d\s().-]+")
+
+
+def digits_only(s: str) -> str:
+    return "".join(ch for ch in (s or "") if ch.isdigit())
+
+
+def normalize(s: str) -> str:
+    """National digits of a full number; anything else just loses its punctuation."""
+    digits = digits_only(s)
+    if len(digits) == len(COUNTRY_CODE) + NATIONAL_LENGTH and digits.startswith(COUNTRY_CODE):
+        return digits[len(COUNTRY_CODE):]
+    if len(digits) == 1 + NATIONAL_LENGTH and digits.startswith("0"):
+        return digits[1:]
+    return digits
+
+
+def fill_digits(instance, names, update_fields=None):
+    """
+    Set <name>_digits and <name>_digits_rev on instance from each phone
+    field in names. Returns update_fields with the companions added when
+    the phone field itself is being saved.
+    """
+    for name in names:
+        digits = normalize(getattr(instance, name))
+        setattr(instance, f"{name}_digits", digits)
+        setattr(instance, f"{name}_digits_rev", digits[::-1])
+
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    for name in names:
+        if name in update_fields:
+            update_fields |= {f"{name}_digits", f"{name}_digits_rev"}
+    return update_fields
+
+
+def search_digits(term):
+    """
+    The digits to look up for a search term, or None if it isn't a phone
+    number: "+91 94405" -> "94405", "0944 057" -> "944057", "4394" -> "4394".
+    """
+    term = term.strip()
+    if not _PHONE_INPUT.fullmatch(term):
+        return None
+    digits = digits_only(term)
+    if term.startswith("+") and digits.startswith(COUNTRY_CODE):
+        digits = digits[len(COUNTRY_CODE):]
+    elif digits.startswith("0"):
+        digits = digits[1:]
+    else:
+        digits = normalize(digits)
+    return digits if len(digits) >= MIN_SEARCH_DIGITS else None
+
+
+def _starts_with(field, value):
+    # value <= field < value-with-its-last-digit-bumped, which every backend
+    # answers from the index (unlike LIKE 'value%' on SQLite)
+    return Q(**{f"{field}__gte": value, f"{field}__lt": value[:-1] + chr(ord(value[-1]) + 1)})
+
+
+def phone_q(digits, *names):
+    """Rows where any of the phone fields in names starts or ends with digits."""
+    q = Q()
+    for name in names:
+        q |= _starts_with(f"{name}_digits", digits) | _starts_with(f"{name}_digits_rev", digits[::-1])
+    return q
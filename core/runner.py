@@ -0,0 +1,42 @@
+"""
+The test runner (settings.TEST_RUNNER).
+
+Every test runs against the catalog cache in this process's memory: the
+configured file cache is shared by every process on the host (parallel test
+workers included) and lives in the checkout. Nothing here imports models, so
+a spawned worker can load it before django.setup().
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner, ParallelTestSuite
+from django.test.utils import override_settings
+
+
+def test_caches():
+    return {
+        **settings.CACHES,
+        "catalog": {
+            **settings.CACHES["catalog"], **settings.CATALOG_CACHE_BACKENDS["locmem"], "LOCATION": "catalog-tests",
+        },
+    }
+
+
+def _use_test_caches(*args):
+    override_settings(CACHES=test_caches()).enable()
+
+
+class TestSuite(ParallelTestSuite):
+    # spawned workers read settings.py afresh (forked ones inherit the override)
+    process_setup = _use_test_caches
+
+
+class TestRunner(DiscoverRunner):
+    parallel_test_suite = TestSuite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_caches = override_settings(CACHES=test_caches())
+        self._test_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,105 @@
+"""Seed data and query-budget assertions shared by the apps' tests."""
+import os
+import time
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from catalog.models import Brand, Category, Product
+from catalog.search import get_backend
+from catalog.version import bump_catalog_version
+from core.phone import fill_digits
+from orders import summaries
+from orders.models import Order, OrderItem
+
+# Rendering templates that use {% static %} without a collectstatic
+# manifest, and invoice PDFs without touching the disk
+TEST_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "invoices": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+}
+
+# Query counts are the hard gate; the time limit only catches a view that
+# went quadratic, so it is loose enough for a loaded (or --parallel) runner
+MAX_SECONDS = float(os.environ.get("QUERY_BUDGET_MAX_SECONDS", "3"))
+
+
+def seed_catalog(products=30, brands=3, categories=3, prefix="Item"):
+    """Brands, categories and products spread across them, indexed for search."""
+    brand_objs = [Brand.objects.get_or_create(name=f"{prefix} Brand {i}")[0] for i in range(brands)]
+    category_objs = [Category.objects.get_or_create(name=f"{prefix} Category {i}")[0] for i in range(categories)]
+    created = Product.objects.bulk_create([
+        Product(
+            brand=brand_objs[i % brands],
+            category=category_objs[i % categories],
+            name=f"{prefix} Pen {i}",
+            price=Decimal(5 + (i * 7) % 400),
+            stock_quantity=i % 12,
+        )
+        for i in range(products)
+    ])
+    # bulk_create sends no signals
+    get_backend().index_products([p.id for p in created])
+    bump_catalog_version()
+    return created
+
+
+def seed_orders(user, products, orders=3, items=5):
+    """Orders for user, each with `items` lines snapshotted from products."""
+    created = [Order(user=user, phone="9440574394", whatsapp="9440574394", address="Namdevada") for _ in range(orders)]
+    for order in created:
+        # bulk_create skips Order.save()
+        fill_digits(order, ("phone", "whatsapp"))
+    Order.objects.bulk_create(created)
+    lines = []
+    for order in created:
+        for product in products[:items]:
+            lines.append(OrderItem(
+                order=order, product=product, qty=2,
+                product_name=product.name, unit_price=product.price, line_total=product.price * 2,
+            ))
+        own = [line for line in lines if line.order is order]
+        order.item_count = 2 * len(own)
+        order.total = sum((line.line_total for line in own), Decimal("0.00"))
+        order.summary = summaries.build(user.username, [
+            (line.product_id, line.product_name, line.qty, line.unit_price, line.line_total) for line in own
+        ])
+    OrderItem.objects.bulk_create(lines)
+    Order.objects.bulk_update(created, ["item_count", "total", "summary"])
+    return created
+
+
+class QueryBudgetMixin:
+    """
+    assertQueryBudget(request, budget, grow=...): the request stays within
+    budget queries and MAX_SECONDS, and, after grow() adds more data, issues
+    exactly as many queries as before (no N+1).
+
+    Every measurement starts from a new catalog version, so the catalog
+    caches are cold and budgets are worst-case.
+    """
+
+    def _measure(self, request):
+        bump_catalog_version()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request()
+            elapsed = time.perf_counter() - started
+        self.assertLess(response.status_code, 400, response)
+        self.assertLess(elapsed, MAX_SECONDS, f"took {elapsed:.2f}s (QUERY_BUDGET_MAX_SECONDS={MAX_SECONDS})")
+        # copy now: the next request resets the connection's query log
+        return response, list(queries)
+
+    def assertQueryBudget(self, request, budget, grow=None):
+        response, queries = self._measure(request)
+        sql = "\n".join(q["sql"] for q in queries)
+        self.assertLessEqual(len(queries), budget, f"{len(queries)} queries:\n{sql}")
+
+        if grow is not None:
+            grow()
+            response, grown = self._measure(request)
+            sql = "\n".join(q["sql"] for q in grown)
+            self.assertEqual(len(grown), len(queries), f"query count grew with the data:\n{sql}")
+        return response
@@ -0,0 +1,115 @@
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    __slots__ = ("queries", "db", "template", "template_depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - started
+        timings.queries += 1
+
+
+class TimedTemplate:
+    """Wraps a backend template so render() time is added to the current request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return self.template.render(context, request)
+
+        # a template rendered from inside another is already being timed
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class ServerTimingMiddleware:
+    """
+    Per request: query count, DB time, template time and total app time,
+    sent as a Server-Timing header (if SERVER_TIMING_HEADER; off unless
+    DEBUG) and logged as one logfmt line on the "core.timing" logger
+    (WARNING when over the SLOW_REQUEST_* thresholds).
+
+    Costs one perf_counter() pair per query and per top-level render.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_time_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - started
+
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = (
+                f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries", '
+                f"tpl;dur={timings.template * 1000:.1f}, "
+                f"app;dur={total * 1000:.1f}"
+            )
+
+        slow = (
+            total * 1000 > settings.SLOW_REQUEST_MS
+            or timings.queries > settings.SLOW_REQUEST_QUERIES
+        )
+        level = logging.WARNING if slow else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(
+                level,
+                "method=%s path=%s status=%s app_ms=%.1f db_ms=%.1f queries=%d tpl_ms=%.1f slow=%d",
+                request.method, request.path, response.status_code, total * 1000,
+                timings.db * 1000, timings.queries, timings.template * 1000, slow,
+            )
+        return response
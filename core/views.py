@@ -1,5 +1,8 @@
 from django.shortcuts import render
 
+from catalog.cache import cache_catalog_page
+
+@cache_catalog_page
 def home(request):
     return render(request, "core/home.html")
 
@@ -0,0 +1,34 @@
+"""
+Work a fresh process otherwise does on its first requests: resolving the
+URLconf and compiling templates. gunicorn.conf.py runs warm_up() in the
+master before forking, so every worker starts with both already done.
+"""
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template import loader
+from django.urls import get_resolver, reverse
+
+
+def project_templates():
+    """Names of the templates shipped by this project's own apps (not Django's or third parties')."""
+    base = Path(settings.BASE_DIR)
+    for app in apps.get_app_configs():
+        directory = Path(app.path) / "templates"
+        if Path(app.path).parent != base or not directory.is_dir():
+            continue
+        for path in sorted(directory.rglob("*.html")):
+            yield path.relative_to(directory).as_posix()
+
+
+def warm_up():
+    """Import every view, build the reverse-lookup tables and compile the templates; returns the template count."""
+    get_resolver().url_patterns  # imports the URLconfs and, through them, the views
+    reverse("home")  # populates the reverse dicts that {% url %} and redirect() use
+
+    count = 0
+    for name in project_templates():
+        loader.get_template(name)  # kept by the cached template loader
+        count += 1
+    return count
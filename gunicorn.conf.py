@@ -0,0 +1,42 @@
+"""
+gunicorn settings, picked up from the working directory by
+`gunicorn config.wsgi`. Command-line flags and GUNICORN_CMD_ARGS still win.
+
+The app is loaded once in the master (preload_app) and warmed up there, so
+workers fork with Django, the URLconf and the compiled templates already in
+memory (shared copy-on-write) instead of each importing them on its own.
+"""
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Requests mostly wait on SQLite and Cloudinary, so a few threads per worker
+# help; the GIL makes more workers the way to use more cores.
+cpus = os.cpu_count() or 1
+workers = int(os.environ.get("WEB_CONCURRENCY", 2 * cpus + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = True
+timeout = 30
+keepalive = 5
+# recycle workers now and then, staggered so they don't all restart together
+max_requests = 1000
+max_requests_jitter = 100
+
+
+def when_ready(server):
+    # runs in the master after the preloaded app is imported, before forking
+    from core.warmup import warm_up
+
+    started = time.perf_counter()
+    count = warm_up()
+    server.log.info("Warmed up URLconf and %d templates in %.0f ms", count, (time.perf_counter() - started) * 1000)
+
+
+def post_fork(server, worker):
+    # never share a database connection the master may have opened
+    from django.db import connections
+
+    connections.close_all()
@@ -1,53 +1,201 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.http import FileResponse
+from django.utils import timezone
 from django.utils.html import format_html
+import logging
+import tempfile
 import urllib.parse
 
-from .models import Order, OrderItem
+from core.pagination import CappedCountPaginator
+from core.phone import phone_q, search_digits
+from .export import export_invoices
+from .models import Order, OrderItem, OrderStatusChange, OutboxMessage
+from .status import can_transition, transition
+
+logger = logging.getLogger(__name__)
+
+# The ZIP action renders inside a web request, under gunicorn's timeout:
+# a couple of render processes and a bounded number of orders. Bigger
+# exports go through the export_invoices command.
+EXPORT_WORKERS = 2
+EXPORT_MAX_ORDERS = 200
+
+class ProductIdWidget(ForeignKeyRawIdWidget):
+    # the row shows the product_name snapshot already; skip looking up a label per row
+    def label_and_url_for_value(self, value):
+        return "", ""
+
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
+    readonly_fields = ("product_name", "unit_price", "line_total")
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # a <select> of every product would be a query and a huge page per row
+        if db_field.name == "product":
+            kwargs["widget"] = ProductIdWidget(db_field.remote_field, self.admin_site)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+class OrderStatusChangeInline(admin.TabularInline):
+    model = OrderStatusChange
+    extra = 0
+    can_delete = False
+    fields = readonly_fields = ("changed_at", "from_status", "to_status", "changed_by")
+    ordering = ("changed_at", "id")
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("changed_by")
+
+
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = "__all__"
+
+    def clean_status(self):
+        status = self.cleaned_data["status"]
+        current = self.instance.status if self.instance.pk else None
+        if current and status != current and not can_transition(current, status):
+            raise forms.ValidationError(f"An order can't go from {current} to {status}.")
+        return status
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ("id", "user", "fulfillment", "status", "created_at", "send_delivered_whatsapp")
+    # status messages to the customer go through the outbox (see OutboxMessageAdmin)
+    list_display = ("id", "user", "fulfillment", "status", "item_count", "total", "created_at")
     list_filter = ("status", "fulfillment", "created_at")
-    search_fields = ("user__username", "phone", "whatsapp")
-    inlines = [OrderItemInline]
+    # phone numbers are searched through the indexed digit columns, see get_search_results
+    search_fields = ("user__username",)
+    form = OrderAdminForm
+    inlines = [OrderItemInline, OrderStatusChangeInline]
+
+    # item_count and total are stored on the order, so rows need no
+    # aggregation; the username comes in the same query
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    date_hierarchy = "created_at"
+    paginator = CappedCountPaginator
+    show_full_result_count = False
 
-    actions = ["mark_confirmed", "mark_packed", "mark_out_for_delivery", "mark_delivered", "mark_cancelled"]
+    readonly_fields = (
+        "total", "item_count", "confirmed_at", "packed_at", "out_for_delivery_at", "delivered_at", "cancelled_at",
+    )
+
+    actions = ["mark_confirmed", "mark_packed", "mark_out_for_delivery", "mark_delivered", "mark_cancelled", "export_invoice_zip"]
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # usernames are often phone numbers, so digits search both
+        digits = search_digits(search_term)
+        if digits is not None:
+            results |= queryset.filter(phone_q(digits, "phone", "whatsapp"))
+        return results, may_have_duplicates
+
+    def get_queryset(self, request):
+        # the change page title is Order.__str__, which needs the username
+        return super().get_queryset(request).select_related("user")
+
+    def _transition(self, request, queryset, status):
+        result = transition(queryset, status, user=request.user)
+        self.message_user(request, f"{result.changed} order(s) marked {status}.")
+        if result.skipped:
+            self.message_user(
+                request, f"{result.skipped} order(s) skipped: already {status} or can't move there.", messages.WARNING,
+            )
 
     @admin.action(description="Mark selected orders as Confirmed")
     def mark_confirmed(self, request, queryset):
-        queryset.update(status="Confirmed")
+        self._transition(request, queryset, "Confirmed")
 
     @admin.action(description="Mark selected orders as Packed")
     def mark_packed(self, request, queryset):
-        queryset.update(status="Packed")
+        self._transition(request, queryset, "Packed")
 
     @admin.action(description="Mark selected orders as Out for Delivery")
     def mark_out_for_delivery(self, request, queryset):
-        queryset.update(status="Out for Delivery")
+        self._transition(request, queryset, "Out for Delivery")
 
     @admin.action(description="Mark selected orders as Delivered")
     def mark_delivered(self, request, queryset):
-        queryset.update(status="Delivered")
+        self._transition(request, queryset, "Delivered")
 
     @admin.action(description="Mark selected orders as Cancelled")
     def mark_cancelled(self, request, queryset):
-        queryset.update(status="Cancelled")
+        self._transition(request, queryset, "Cancelled")
 
-    def send_delivered_whatsapp(self, obj):
-        if not obj.whatsapp:
-            return "-"
+    @admin.action(description="Download invoices (ZIP) for selected orders")
+    def export_invoice_zip(self, request, queryset):
+        count = queryset.count()
+        if count > EXPORT_MAX_ORDERS:
+            self.message_user(
+                request,
+                f"{count} orders selected; the admin exports at most {EXPORT_MAX_ORDERS} at a time. "
+                "Use the export_invoices management command for larger exports.",
+                messages.ERROR,
+            )
+            return None
+
+        # spooled to disk so a month of invoices never sits in memory
+        fh = tempfile.TemporaryFile()
+        stats = export_invoices(queryset, fh, workers=EXPORT_WORKERS)
+        fh.seek(0)
+
+        logger.info("Invoice export: %s", stats)
+        self.message_user(request, f"Exported {stats}")
 
-        msg = f"Hi! Your order #{obj.id} from Sri Maha Laxmi Traders has been Delivered ✅. Thank you!"
-        url = f"https://wa.me/{self._digits_only(obj.whatsapp)}?text={urllib.parse.quote(msg)}"
-        return format_html('<a href="{}" target="_blank">Send Delivered</a>', url)
+        filename = f"invoices_{timezone.localdate():%Y%m%d}.zip"
+        return FileResponse(fh, as_attachment=True, filename=filename, content_type="application/zip")
 
-    send_delivered_whatsapp.short_description = "WhatsApp"
+    def save_model(self, request, obj, form, change):
+        if not (change and "status" in form.changed_data):
+            return super().save_model(request, obj, form, change)
 
-    def _digits_only(self, s: str) -> str:
-        return "".join(ch for ch in s if ch.isdigit())
+        # the other fields as edited, then the status through the state machine
+        # (history, timestamp, notification), in the change view's transaction
+        status, obj.status = obj.status, form.initial["status"]
+        super().save_model(request, obj, form, change)
+        transition(Order.objects.filter(pk=obj.pk), status, user=request.user)
+        obj.status = status
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # also rebuilds the summary the inline's item saves cleared
+        form.instance.refresh_totals()
+        Order.objects.filter(pk=form.instance.pk).bump_revision()
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(admin.ModelAdmin):
+    list_display = ("id", "order", "product_name", "qty", "unit_price", "line_total")
+    list_select_related = ("order__user",)
+    search_fields = ("product_name", "order__id")
+    raw_id_fields = ("order", "product")
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "order", "kind", "recipient", "state", "attempts", "next_attempt_at", "sent_at", "send_by_hand")
+    list_filter = ("state", "kind")
+    list_select_related = ("order__user",)
+    search_fields = ("order__id",)
+    raw_id_fields = ("order",)
+    readonly_fields = ("idempotency_key", "attempts", "last_error", "sent_at")
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+    def send_by_hand(self, obj):
+        # only once the outbox gave up: any earlier and the customer gets it twice
+        if obj.state != OutboxMessage.FAILED:
+            return "-"
+        url = f"https://wa.me/{obj.recipient}?text={urllib.parse.quote(obj.body)}"
+        return format_html('<a href="{}" target="_blank">Send on WhatsApp</a>', url)
 
-admin.site.register(OrderItem)
+    send_by_hand.short_description = "WhatsApp"
@@ -1,12 +1,100 @@
-class Cart:
-    def __init__(self, request):
-        self.session = request.session
-        cart = self.session.get("cart")
+from django.conf import settings
+
+CART_COOKIE = "cart"
+SESSION_KEY = "cart"
+
+# Encoded carts longer than this go to the session instead of the cookie
+# (browsers cap a cookie at ~4 KB; this leaves room for the signature)
+COOKIE_MAX_BYTES = 2000
+
+
+def encode(cart):
+    """{"12": 3, "45": 1} -> "12:3|45:1" (no characters that need cookie quoting)"""
+    return "|".join(f"{pid}:{qty}" for pid, qty in cart.items())
+
+
+def decode(value):
+    cart = {}
+    for item in value.split("|"):
+        pid, sep, qty = item.partition(":")
+        if sep and pid.isdigit() and qty.isdigit() and int(qty) > 0:
+            cart[pid] = int(qty)
+    return cart
+
+
+class SessionCartStore:
+    """The cart dict in request.session: every change rewrites the session row."""
+
+    def load(self, request):
+        return dict(request.session.get(SESSION_KEY) or {})
+
+    def save(self, request, cart):
+        request.session[SESSION_KEY] = cart
+
+    def write_response(self, request, response):
+        pass
+
 
-        if not cart:
-            cart = self.session["cart"] = {}
+class CookieCartStore(SessionCartStore):
+    """
+    Small carts live in a signed cookie, so a cart change costs a
+    Set-Cookie header instead of a session UPDATE. Carts too big for a
+    cookie fall back to the session.
+    """
 
-        self.cart = cart
+    def _salt(self, request):
+        # a cart cookie left behind on a shared device is not valid for the next user
+        return f"orders.cart.{request.user.pk}"
+
+    def load(self, request):
+        value = request.get_signed_cookie(
+            CART_COOKIE, default=None, salt=self._salt(request), max_age=settings.SESSION_COOKIE_AGE,
+        )
+        if value is not None:
+            return decode(value)
+        return super().load(request)
+
+    def save(self, request, cart):
+        value = encode(cart)
+        if len(value) > COOKIE_MAX_BYTES:
+            super().save(request, cart)
+            request._cart_cookie = ""
+            return
+
+        if SESSION_KEY in request.session:
+            # moving a formerly large cart back out of the session
+            del request.session[SESSION_KEY]
+        request._cart_cookie = value
+
+    def write_response(self, request, response):
+        value = getattr(request, "_cart_cookie", None)
+        if value is None:
+            return
+        if value:
+            response.set_signed_cookie(
+                CART_COOKIE, value, salt=self._salt(request),
+                max_age=settings.SESSION_COOKIE_AGE, httponly=True, samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        else:
+            response.delete_cookie(CART_COOKIE, samesite="Lax")
+
+
+CART_STORES = {
+    "session": SessionCartStore,
+    "cookie": CookieCartStore,
+}
+
+
+def get_store():
+    return CART_STORES[settings.CART_STORE]()
+
+
+class Cart:
+    def __init__(self, request):
+        self.request = request
+        self.store = get_store()
+        self.cart = self.store.load(request)
 
     def add(self, product_id, qty=1):
         pid = str(product_id)
@@ -42,8 +130,8 @@ class Cart:
             self.save()
 
     def clear(self):
-        self.session["cart"] = {}
+        self.cart = {}
         self.save()
 
     def save(self):
-        self.session.modified = True
+        self.store.save(self.request, self.cart)
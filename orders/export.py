@@ -0,0 +1,123 @@
+import io
+import multiprocessing
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import django
+
+from . import invoices
+from .pdf import render_invoice
+from .pricing import price_order
+
+
+class ExportStats:
+    def __init__(self):
+        self.count = 0
+        self.rendered = 0
+        self.cached = 0
+        self.seconds = 0.0
+
+    @property
+    def per_second(self):
+        return self.count / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.count} invoices ({self.rendered} rendered, {self.cached} from cache) "
+            f"in {self.seconds:.2f}s - {self.per_second:.1f} invoices/sec"
+        )
+
+
+def _render_job(job):
+    order, pricing = job
+    buf = io.BytesIO()
+    render_invoice(order, pricing, buf)
+    return buf.getvalue()
+
+
+def _jobs(orders):
+    """Yield (filename, cached_name or None, job) without loading every order at once."""
+    store = invoices.storage()
+    # lines come from each order's summary; only an order whose summary was
+    # cleared by an item edit outside the admin reads its items on its own
+    orders = orders.select_related("user").order_by("id")
+
+    for order in orders.iterator(chunk_size=200):
+        filename = f"invoice_order_{order.id}.pdf"
+        cached = invoices.artifact_name(order)
+        if store.exists(cached):
+            yield filename, cached, None
+        else:
+            yield filename, None, (order, price_order(order))
+
+
+def export_invoices(orders, fh, workers=None):
+    """
+    Write one PDF per order in the queryset into a ZIP on fh.
+
+    Uncached invoices are rendered across a process pool; at most
+    2 * workers PDFs are held in memory at any time. workers=1 renders in
+    this process instead. Already-cached artifacts are copied straight
+    from invoice storage.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = ExportStats()
+    started = time.perf_counter()
+
+    store = invoices.storage()
+    pending = deque()
+
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_STORED) as zf, _pool(workers) as pool:
+
+        def drain(limit):
+            while len(pending) > limit:
+                filename, future = pending.popleft()
+                zf.writestr(filename, future.result())
+                stats.rendered += 1
+                stats.count += 1
+
+        for filename, cached, job in _jobs(orders):
+            if cached:
+                with store.open(cached, "rb") as src, zf.open(filename, "w") as dst:
+                    dst.write(src.read())
+                stats.cached += 1
+                stats.count += 1
+                continue
+
+            pending.append((filename, pool.submit(_render_job, job)))
+            drain(workers * 2)
+
+        drain(0)
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+class _InProcess:
+    """The one-worker "pool": renders on submit(), in this process."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def _pool(workers):
+    if workers == 1:
+        return _InProcess()
+    # spawn, not fork: the admin action runs this inside a multi-threaded
+    # gunicorn worker, and a forked child can inherit a lock held by
+    # another thread (or its database connection) and hang. The workers
+    # set Django up before unpickling any job (this module imports models).
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=django.setup,
+    )
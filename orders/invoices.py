@@ -0,0 +1,75 @@
+import io
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+
+from .pdf import render_invoice
+from .pricing import price_order
+
+# Bump when the PDF layout changes so browsers drop their cached copies
+LAYOUT_VERSION = 2
+
+STORAGE_ALIAS = "invoices"
+
+
+def storage():
+    return storages[STORAGE_ALIAS]
+
+
+def etag(order_id, revision):
+    return f'"inv-{order_id}-{revision}-{LAYOUT_VERSION}"'
+
+
+def artifact_name(order):
+    return f"order_{order.id}/r{order.revision}-l{LAYOUT_VERSION}.pdf"
+
+
+def render_bytes(order):
+    buf = io.BytesIO()
+    render_invoice(order, price_order(order), buf)
+    return buf.getvalue()
+
+
+def get_or_render(order):
+    """
+    Return the storage name of the PDF for the order's current revision,
+    rendering and saving it on first use. Older revisions are removed.
+    """
+    store = storage()
+    name = artifact_name(order)
+    if store.exists(name):
+        return name
+
+    saved = store.save(name, ContentFile(render_bytes(order)))
+    if saved != name:
+        # another request rendered the same revision first; keep theirs
+        store.delete(saved)
+
+    _prune(store, order)
+    return name
+
+
+def _prune(store, order):
+    """Delete artifacts of earlier revisions (never newer ones another worker may be serving)."""
+    folder = f"order_{order.id}"
+    try:
+        _, files = store.listdir(folder)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for filename in files:
+        revision = filename[1:].split("-", 1)[0]
+        if revision.isdigit() and int(revision) < order.revision:
+            store.delete(posixpath.join(folder, filename))
+
+
+def delete_artifacts(order_id):
+    """Delete every stored PDF of the order, whatever its revision."""
+    store = storage()
+    folder = f"order_{order_id}"
+    try:
+        _, files = store.listdir(folder)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for filename in files:
+        store.delete(posixpath.join(folder, filename))
@@ -0,0 +1,76 @@
+import secrets
+import statistics
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+
+from catalog.models import Product
+from orders.cart import CART_STORES
+
+# A fresh prefix per run, so no existing account is reused or deleted
+USERNAME = "bench-cart-{run}-{index}"
+
+
+class Command(BaseCommand):
+    help = "Benchmark cart updates per second for each cart store (uses the configured database)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ops", type=int, default=300, help="Cart updates per shopper")
+        parser.add_argument("--shoppers", type=int, default=4, help="Concurrent shoppers (threads)")
+        parser.add_argument("--lines", type=int, default=5, help="Products in each cart")
+        parser.add_argument("--store", action="append", choices=sorted(CART_STORES), help="Store(s) to run; default all")
+
+    def handle(self, *args, **opts):
+        product_ids = list(Product.objects.filter(is_active=True).values_list("id", flat=True)[:opts["lines"]])
+        if len(product_ids) < opts["lines"]:
+            raise CommandError(f"Needs at least {opts['lines']} active products.")
+
+        run = secrets.token_hex(4)
+        users = [User.objects.create_user(USERNAME.format(run=run, index=i)) for i in range(opts["shoppers"])]
+        try:
+            for store in opts["store"] or sorted(CART_STORES):
+                with override_settings(CART_STORE=store):
+                    self.run(store, users, product_ids, opts["ops"])
+        finally:
+            # only the users created above
+            User.objects.filter(id__in=[u.id for u in users]).delete()
+
+    def run(self, store, users, product_ids, ops):
+        timings = []
+        lock = threading.Lock()
+
+        def shopper(user):
+            client = Client(HTTP_HOST="localhost")
+            client.force_login(user)
+            for pid in product_ids:
+                client.get(f"/cart/add/{pid}/")
+
+            mine = []
+            for i in range(ops):
+                started = time.perf_counter()
+                client.post(f"/cart/update/{product_ids[i % len(product_ids)]}/", {"qty": str(i % 9 + 1)})
+                mine.append((time.perf_counter() - started) * 1000)
+
+            client.logout()
+            connection.close()
+            with lock:
+                timings.extend(mine)
+
+        threads = [threading.Thread(target=shopper, args=(user,)) for user in users]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"{store:>8}: {len(timings) / elapsed:7.1f} updates/sec across {len(users)} shoppers, "
+            f"mean {statistics.mean(timings):.2f} ms, p95 {p95:.2f} ms"
+        )
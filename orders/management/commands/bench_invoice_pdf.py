@@ -0,0 +1,53 @@
+import io
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+from orders.pdf import render_invoice
+from orders.pricing import PricedCart, PricedLine
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark: per-invoice PDF render time (no database access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--invoices", type=int, default=200, help="Invoices to render")
+        parser.add_argument("--lines", type=int, default=25, help="Line items per invoice")
+
+    def handle(self, *args, **opts):
+        order = Order(
+            id=1001, user=User(username="bench"), phone="+91 9440574394",
+            whatsapp="+91 9440574394", fulfillment="delivery",
+            address="6-8-151, Namdevada, Nizamabad 503002, Telangana",
+        )
+        lines = [
+            PricedLine(i, f"Product {i} - Notebook 200 pages", 2, Decimal("45.50"), Decimal("91.00"))
+            for i in range(opts["lines"])
+        ]
+        pricing = PricedCart(lines, sum((l.subtotal for l in lines), Decimal("0.00")))
+
+        # first render pays one-off costs (font loading etc.); report it separately
+        started = time.perf_counter()
+        render_invoice(order, pricing, io.BytesIO())
+        first_ms = (time.perf_counter() - started) * 1000
+
+        timings = []
+        size = 0
+        for _ in range(opts["invoices"]):
+            buf = io.BytesIO()
+            started = time.perf_counter()
+            render_invoice(order, pricing, buf)
+            timings.append((time.perf_counter() - started) * 1000)
+            size = buf.tell()
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        self.stdout.write(
+            f"{opts['invoices']} invoices x {opts['lines']} lines: "
+            f"first {first_ms:.2f} ms, mean {statistics.mean(timings):.2f} ms, "
+            f"p95 {p95:.2f} ms, {size} bytes/invoice"
+        )
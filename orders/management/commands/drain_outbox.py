@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.notifications import BATCH_SIZE, MAX_ATTEMPTS, drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the WhatsApp notifications waiting in the outbox, in batches, retrying failures with backoff. "
+        "Stops when nothing is due, unless --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Messages claimed per batch")
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="Tries before a message is marked failed")
+        parser.add_argument("--loop", action="store_true", help="Keep running, polling for new messages")
+        parser.add_argument("--interval", type=float, default=5.0, help="Seconds between polls once caught up (--loop)")
+
+    def handle(self, *args, **opts):
+        while True:
+            # a long-running worker must not hold on to a connection past CONN_MAX_AGE
+            close_old_connections()
+            stats = drain(batch_size=opts["batch_size"], max_attempts=opts["max_attempts"])
+            if stats.claimed:
+                self.stdout.write(str(stats))
+
+            if stats.claimed < opts["batch_size"]:
+                # caught up: everything due was in this batch
+                if not opts["loop"]:
+                    return
+                time.sleep(opts["interval"])
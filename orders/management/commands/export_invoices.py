@@ -0,0 +1,34 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.export import export_invoices
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Export invoice PDFs for a date range into a ZIP file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Path of the ZIP file to write")
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--status", action="append", help="Only these statuses (repeatable)")
+        parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+
+    def handle(self, *args, **opts):
+        orders = Order.objects.all()
+        if opts["date_from"]:
+            orders = orders.filter(created_at__date__gte=opts["date_from"])
+        if opts["date_to"]:
+            orders = orders.filter(created_at__date__lte=opts["date_to"])
+        if opts["status"]:
+            orders = orders.filter(status__in=opts["status"])
+
+        if not orders.exists():
+            raise CommandError("No orders match the given filters.")
+
+        with open(opts["output"], "wb") as fh:
+            stats = export_invoices(orders, fh, workers=opts["workers"])
+
+        self.stdout.write(self.style.SUCCESS(f"Exported {stats} -> {opts['output']}"))
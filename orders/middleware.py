@@ -0,0 +1,13 @@
+from .cart import get_store
+
+
+class CartMiddleware:
+    """Writes a changed cart cookie (see orders.cart.CookieCartStore) onto the response."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        get_store().write_response(request, response)
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:46
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def backfill(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+
+    # Existing orders never stored prices, so the current product price is the best we have
+    items = list(OrderItem.objects.select_related("product"))
+    for item in items:
+        item.product_name = item.product.name
+        item.unit_price = item.product.price
+        item.line_total = item.product.price * item.qty
+    OrderItem.objects.bulk_update(items, ["product_name", "unit_price", "line_total"], batch_size=500)
+
+    orders = list(Order.objects.annotate(items_total=Sum("items__line_total"), units=Sum("items__qty")))
+    for order in orders:
+        order.total = order.items_total or Decimal("0.00")
+        order.item_count = order.units or 0
+    Order.objects.bulk_update(orders, ["total", "item_count"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_totals_orderitem_snapshots'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
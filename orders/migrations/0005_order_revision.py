@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_backfill_order_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='revision',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
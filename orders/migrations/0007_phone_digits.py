@@ -0,0 +1,56 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+from core.phone import normalize
+
+
+def backfill(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    table = schema_editor.quote_name(Order._meta.db_table)
+    sql = (
+        f"UPDATE {table} SET phone_digits = %s, phone_digits_rev = %s, "
+        f"whatsapp_digits = %s, whatsapp_digits_rev = %s WHERE id = %s"
+    )
+
+    # one prepared UPDATE per row; bulk_update's CASE WHEN is far slower on big tables
+    with schema_editor.connection.cursor() as cursor:
+        batch = []
+        for pk, phone, whatsapp in Order.objects.values_list("id", "phone", "whatsapp").iterator(chunk_size=2000):
+            phone, whatsapp = normalize(phone), normalize(whatsapp)
+            batch.append((phone, phone[::-1], whatsapp, whatsapp[::-1], pk))
+            if len(batch) == 2000:
+                cursor.executemany(sql, batch)
+                batch = []
+        cursor.executemany(sql, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='phone_digits_rev',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='whatsapp_digits',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='whatsapp_digits_rev',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:05
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+CHUNK = 2000
+
+
+def build(customer, lines):
+    """orders.summaries.build as of this migration (layout version 1), frozen."""
+    return {
+        "v": 1,
+        "customer": customer,
+        "lines": [[pid, name, qty, str(price), str(total)] for pid, name, qty, price, total in lines],
+    }
+
+
+def backfill(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    connection = schema_editor.connection
+    field = Order._meta.get_field("summary")
+    table = schema_editor.quote_name(Order._meta.db_table)
+    sql = f"UPDATE {table} SET summary = %s WHERE id = %s"
+
+    def write(cursor, orders):
+        items = (
+            OrderItem.objects.filter(order_id__in=orders)
+            .order_by("order_id", "id")
+            .values_list("order_id", "product_id", "product_name", "qty", "unit_price", "line_total")
+        )
+        lines = {order_id: [row[1:] for row in rows] for order_id, rows in groupby(items, key=lambda row: row[0])}
+        # one prepared UPDATE per row, as in 0007
+        cursor.executemany(sql, [
+            (field.get_db_prep_save(build(username, lines.get(pk, [])), connection), pk)
+            for pk, username in orders.items()
+        ])
+
+    with connection.cursor() as cursor:
+        orders = {}
+        for pk, username in Order.objects.values_list("id", "user__username").order_by("id").iterator(chunk_size=CHUNK):
+            orders[pk] = username
+            if len(orders) == CHUNK:
+                write(cursor, orders)
+                orders = {}
+        if orders:
+            write(cursor, orders)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_order_user_history_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='summary',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
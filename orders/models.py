@@ -1,6 +1,57 @@
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.contrib.auth.models import User
 from catalog.models import Product
+from core.phone import fill_digits
+from . import summaries
+
+class OrderQuerySet(models.QuerySet):
+    def bump_revision(self, **changes):
+        """UPDATE the orders (optionally with other field changes) and invalidate cached invoices."""
+        return self.update(revision=F("revision") + 1, **changes)
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None, **kwargs):
+        """
+        QuerySet.datetimes() for created_at by year, month or day, found with
+        one indexed EXISTS per candidate period between the first and last
+        order. The stock version truncates every row (a Python function per
+        row on SQLite) to DISTINCT them; the admin date_hierarchy asks for
+        this on every changelist page.
+        """
+        if field_name != "created_at" or kind not in ("year", "month", "day") or tzinfo is not None or kwargs:
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+
+        # two index seeks; SQLite only optimizes a lone MIN() or MAX()
+        dates = self.order_by().values_list("created_at", flat=True)
+        first, last = dates.order_by("created_at").first(), dates.order_by("-created_at").first()
+        if first is None:
+            return []
+
+        tz = timezone.get_current_timezone()
+        start = timezone.localtime(first, tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        if kind in ("year", "month"):
+            start = start.replace(day=1)
+        if kind == "year":
+            start = start.replace(month=1)
+
+        periods = []
+        while start <= last:
+            if kind == "year":
+                end = start.replace(year=start.year + 1)
+            elif kind == "month":
+                end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+            else:
+                end = datetime.combine(start.date() + timedelta(days=1), time(), tzinfo=tz)
+            if self.filter(created_at__gte=start, created_at__lt=end).exists():
+                periods.append(start)
+            start = end
+        return periods if order == "ASC" else periods[::-1]
+
 
 class Order(models.Model):
     FULFILLMENT_CHOICES = [
@@ -23,19 +74,157 @@ class Order(models.Model):
 
     phone = models.CharField(max_length=20, blank=True)
     whatsapp = models.CharField(max_length=20, blank=True)  # customer whatsapp
+    # normalized copies for indexed search, kept in sync by save() (see core.phone)
+    phone_digits = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+    phone_digits_rev = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+    whatsapp_digits = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+    whatsapp_digits_rev = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
     address = models.TextField(blank=True)
     notes = models.TextField(blank=True)
 
     status = models.CharField(max_length=30, choices=STATUS_CHOICES, default="New")
     created_at = models.DateTimeField(auto_now_add=True)
+    # when the order entered each status; set by orders.status.transition()
+    confirmed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    packed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    out_for_delivery_at = models.DateTimeField(null=True, blank=True, editable=False)
+    delivered_at = models.DateTimeField(null=True, blank=True, editable=False)
+    cancelled_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # denormalized at checkout so invoices/admin don't re-add the items
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    item_count = models.PositiveIntegerField(default=0)
+
+    # username and lines for order_success and the invoices (see orders.summaries)
+    summary = models.JSONField(default=dict, blank=True, editable=False)
+
+    # content version of the invoice; bumped whenever status or items change
+    revision = models.PositiveIntegerField(default=1)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # admin date_hierarchy and its date drill-down filters
+            models.Index(fields=["created_at"], name="order_created_at_idx"),
+            # a customer's order history, newest first, in keyset order
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_history_idx"),
+            # the shop floor's queues: one status, by day, oldest first
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username}"
 
+    def save(self, *args, update_fields=None, **kwargs):
+        update_fields = fill_digits(self, ("phone", "whatsapp"), update_fields)
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @property
+    def customer_name(self):
+        # from the summary when there is one, which spares loading the user
+        if summaries.is_current(self.summary):
+            return self.summary["customer"]
+        return self.user.username
+
+    def refresh_totals(self, save=True):
+        """Recompute total, item_count and the summary from the items."""
+        lines = list(self.items.order_by("id").values_list(
+            "product_id", "product_name", "qty", "unit_price", "line_total"
+        ))
+        self.total = sum((line[4] for line in lines), Decimal("0.00"))
+        self.item_count = sum(line[2] for line in lines)
+        self.summary = summaries.build(self.user.username, lines)
+        if save:
+            self.save(update_fields=["total", "item_count", "summary"])
+
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     qty = models.PositiveIntegerField(default=1)
 
+    # snapshots taken at checkout, so editing a product never rewrites old invoices
+    product_name = models.CharField(max_length=200, blank=True)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the product the snapshot was taken from, to notice a switch (e.g. in the admin inline)
+        instance._snapshot_product_id = instance.__dict__.get("product_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        switched = self.product_id != getattr(self, "_snapshot_product_id", self.product_id)
+        if not self.product_name or switched:
+            self.product_name = self.product.name
+            self.unit_price = self.product.price
+        self.line_total = self.unit_price * self.qty
+        super().save(*args, **kwargs)
+        self._snapshot_product_id = self.product_id
+
+    def __str__(self):
+        # the snapshot, so listing items doesn't load every product
+        return f"{self.product_name} x {self.qty}"
+
+
+class OrderStatusChange(models.Model):
+    """One status change of an order, written by orders.status.transition()."""
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="status_changes")
+    from_status = models.CharField(max_length=30, choices=Order.STATUS_CHOICES)
+    to_status = models.CharField(max_length=30, choices=Order.STATUS_CHOICES)
+    changed_at = models.DateTimeField()
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["order", "changed_at"], name="order_status_change_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.order_id}: {self.from_status} -> {self.to_status}"
+
+
+class OutboxMessage(models.Model):
+    """
+    A WhatsApp notification waiting to be sent, written in the same
+    transaction as the order change it reports. drain_outbox sends them
+    (see orders.notifications), so no request waits on the provider.
+    """
+
+    KIND_CHOICES = [
+        ("placed", "Order placed"),
+        ("status", "Status changed"),
+    ]
+
+    PENDING, SENT, FAILED = "pending", "sent", "failed"
+    STATE_CHOICES = [
+        (PENDING, "Pending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="notifications")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    recipient = models.CharField(max_length=20)  # digits with country code, as wa.me takes them
+    body = models.TextField()
+    # passed to the provider, which drops a resend of a message it already has
+    idempotency_key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker's "pending and due" scan
+            models.Index(fields=["state", "next_attempt_at"], name="outbox_due_idx"),
+        ]
+
     def __str__(self):
-        return f"{self.product.name} x {self.qty}"
+        return f"{self.get_kind_display()} #{self.order_id} -> {self.recipient} ({self.state})"
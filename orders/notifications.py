@@ -0,0 +1,209 @@
+"""
+WhatsApp notifications through a transactional outbox.
+
+Checkout and status changes only INSERT OutboxMessage rows, in the same
+transaction as the change, so a message exists exactly when the change
+committed and no request waits on the provider. drain() (run by the
+drain_outbox command) claims due messages in batches, hands them to the
+configured sender outside any transaction, and records the outcome:
+failures are retried with exponential backoff until MAX_ATTEMPTS.
+
+A claimed batch is leased for LEASE; if the worker dies mid-batch the
+messages come due again, and the idempotency key lets the provider drop
+the ones it had already accepted.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.phone import COUNTRY_CODE, NATIONAL_LENGTH, normalize
+from .models import OutboxMessage
+from .pdf import SHOP_NAME
+from .pricing import price_order
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+LEASE = timedelta(minutes=5)
+
+# First retry after RETRY_BASE, doubling up to RETRY_MAX
+RETRY_BASE = timedelta(seconds=30)
+RETRY_MAX = timedelta(hours=1)
+
+
+# -----------------------------
+# MESSAGES
+# -----------------------------
+def recipient(number):
+    """A number as wa.me and the providers take it: country code and digits only."""
+    digits = normalize(number)
+    return COUNTRY_CODE + digits if len(digits) == NATIONAL_LENGTH else digits
+
+
+def order_placed_message(order, pricing):
+    """The new-order message to the shop (also the text of order_success's WhatsApp link)."""
+    lines = []
+    lines.append(f"New Order #{order.id}")
+    lines.append(f"Customer: {order.customer_name}")
+    lines.append(f"Phone: {order.phone}")
+    lines.append(f"Customer WhatsApp: {order.whatsapp}")
+    lines.append(f"Fulfillment: {order.get_fulfillment_display()}")
+
+    if order.address:
+        lines.append(f"Address: {order.address}")
+    if order.notes:
+        lines.append(f"Notes: {order.notes}")
+
+    lines.append("")
+    lines.append("Items:")
+    for line in pricing:
+        lines.append(f"- {line.name} × {line.qty}")
+
+    lines.append("")
+    lines.append("Please confirm this order.")
+    return "\n".join(lines)
+
+
+def status_message(order_id, status):
+    """The message telling a customer their order moved to status."""
+    if status == "Delivered":
+        return f"Hi! Your order #{order_id} from {SHOP_NAME} has been Delivered ✅. Thank you!"
+    return f"Hi! Your order #{order_id} from {SHOP_NAME} is now {status}."
+
+
+# -----------------------------
+# ENQUEUE (inside the order's transaction)
+# -----------------------------
+def enqueue_order_placed(order):
+    """Queue the new-order message to the shop's WhatsApp number."""
+    return OutboxMessage.objects.create(
+        order=order,
+        kind="placed",
+        recipient=recipient(settings.WHATSAPP_ORDER_NUMBER),
+        body=order_placed_message(order, price_order(order)),
+    )
+
+
+def enqueue_status_changes(orders, status):
+    """Queue a status message for each (order_id, whatsapp) with a number, in one INSERT."""
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(order_id=order_id, kind="status", recipient=recipient(whatsapp), body=status_message(order_id, status))
+        for order_id, whatsapp in orders
+        if normalize(whatsapp)
+    ])
+
+
+# -----------------------------
+# SENDERS
+# -----------------------------
+class SendError(Exception):
+    """A sender could not deliver a message. Permanent errors (a bad number) are not retried."""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class LogSender:
+    """Writes each message to the log instead of sending it; the default until a provider is set up."""
+
+    def send(self, message):
+        logger.info("WhatsApp to %s [%s]:\n%s", message.recipient, message.idempotency_key, message.body)
+
+
+# What LocMemSender "sent", oldest first, like django.core.mail.outbox
+sent_messages = []
+
+
+class LocMemSender:
+    """Keeps messages in sent_messages; for tests and local runs."""
+
+    def send(self, message):
+        sent_messages.append(message)
+
+
+SENDERS = {
+    "log": LogSender,
+    "locmem": LocMemSender,
+}
+
+
+def get_sender():
+    return SENDERS[settings.NOTIFICATION_SENDER]()
+
+
+# -----------------------------
+# DRAIN (the worker)
+# -----------------------------
+class DrainStats:
+    def __init__(self):
+        self.claimed = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def __str__(self):
+        return f"{self.claimed} claimed: {self.sent} sent, {self.retried} to retry, {self.failed} failed"
+
+
+def backoff(attempts):
+    """Wait before the next try after `attempts` failures, with +-20% jitter so retries spread out."""
+    delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets Postgres workers share the queue; SQLite's
+        # IMMEDIATE transactions already run one claim at a time
+        batch = list(
+            OutboxMessage.objects.filter(state=OutboxMessage.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        OutboxMessage.objects.filter(id__in=[m.id for m in batch]).update(next_attempt_at=now + LEASE)
+    return batch
+
+
+def drain(sender=None, batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """Send one batch of due messages and record the outcomes; returns DrainStats."""
+    sender = sender or get_sender()
+    stats = DrainStats()
+    batch = _claim(batch_size)
+    stats.claimed = len(batch)
+
+    sent, failures = [], []
+    for message in batch:
+        try:
+            sender.send(message)
+        except SendError as exc:
+            failures.append((message, exc))
+        except Exception as exc:
+            # a sender bug or an unexpected provider reply: retry, but keep the traceback
+            logger.exception("Sending outbox message %s failed", message.id)
+            failures.append((message, exc))
+        else:
+            sent.append(message.id)
+
+    now = timezone.now()
+    stats.sent = OutboxMessage.objects.filter(id__in=sent).update(
+        state=OutboxMessage.SENT, sent_at=now, attempts=F("attempts") + 1, last_error="",
+    )
+    for message, exc in failures:
+        attempts = message.attempts + 1
+        changes = {"attempts": attempts, "last_error": f"{type(exc).__name__}: {exc}"}
+        if getattr(exc, "permanent", False) or attempts >= max_attempts:
+            changes["state"] = OutboxMessage.FAILED
+            stats.failed += 1
+        else:
+            changes["next_attempt_at"] = now + backoff(attempts)
+            stats.retried += 1
+        OutboxMessage.objects.filter(id=message.id).update(**changes)
+    return stats
@@ -0,0 +1,187 @@
+import functools
+import logging
+import os
+from typing import NamedTuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# reportlab is imported inside the functions below: it adds ~30 ms to every
+# process that imports the orders app (admin autodiscovery does), and most
+# processes never draw a PDF
+
+SHOP_NAME = "Sri Maha Laxmi Traders"
+SHOP_LINES = (
+    "6-8-151, Namdevada, Nizamabad 503002, Telangana",
+    "Phone: +91 9440574394, +91 7386034104",
+    "Email: santhoshchanda4@gmail.com, likith.chanda0404@gmail.com",
+)
+
+# reportlab.lib.pagesizes.A4, in points
+PAGE_WIDTH, PAGE_HEIGHT = A4 = (595.2755905511812, 841.8897637795277)
+LEFT, RIGHT = 50, 545
+TOP = PAGE_HEIGHT - 60
+BOTTOM = 80
+ROW = 14
+
+# Line-item table: (header, x, attribute, max chars)
+COLUMNS = (
+    ("Item", 50, "name", 38),
+    ("Qty", 300, "qty", None),
+    ("Price", 350, "price", None),
+    ("Subtotal", 430, "subtotal", None),
+)
+MONEY_COLUMNS = {"price", "subtotal"}
+
+# Fonts with a "₹" glyph, tried in order when INVOICE_FONT_PATH is missing
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/DejaVuSans.ttf",
+)
+
+LETTERHEAD = "letterhead"
+
+
+class Fonts(NamedTuple):
+    regular: str
+    bold: str
+    rupee: str
+
+
+@functools.lru_cache(maxsize=None)
+def invoice_fonts():
+    """
+    Register the invoice TTF once per process (parsing a TTF is the slow
+    part) and return the font names to use. Falls back, with a warning, to
+    Helvetica, which has no rupee glyph, with "Rs." as the currency mark.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    configured = getattr(settings, "INVOICE_FONT_PATH", "")
+    for path in ([configured] if configured else []) + list(FONT_CANDIDATES):
+        if not os.path.exists(path):
+            continue
+        bold_path = path.replace(".ttf", "-Bold.ttf")
+        pdfmetrics.registerFont(TTFont("InvoiceSans", path))
+        pdfmetrics.registerFont(TTFont("InvoiceSans-Bold", bold_path if os.path.exists(bold_path) else path))
+        return Fonts("InvoiceSans", "InvoiceSans-Bold", "₹")
+
+    logger.warning(
+        "No invoice font found at INVOICE_FONT_PATH=%r or %s; invoices use Helvetica and \"Rs.\" for ₹.",
+        configured, ", ".join(FONT_CANDIDATES),
+    )
+    return Fonts("Helvetica", "Helvetica-Bold", "Rs.")
+
+
+def _define_letterhead(p, fonts):
+    """Static shop header, drawn once per document and reused on every page."""
+    p.beginForm(LETTERHEAD)
+    y = TOP
+    p.setFont(fonts.bold, 16)
+    p.drawString(LEFT, y, SHOP_NAME)
+    y -= 18
+    p.setFont(fonts.regular, 10)
+    for text in SHOP_LINES:
+        p.drawString(LEFT, y, text)
+        y -= ROW
+    p.endForm()
+    return y
+
+
+def _table_header(p, fonts, y):
+    p.setFont(fonts.bold, 10)
+    for header, x, _, _ in COLUMNS:
+        p.drawString(x, y, header)
+    y -= 10
+    p.line(LEFT, y, RIGHT, y)
+    p.setFont(fonts.regular, 10)
+    return y - ROW
+
+
+def _cell(line, attr, limit, fonts):
+    value = getattr(line, attr)
+    if attr in MONEY_COLUMNS:
+        return f"{fonts.rupee} {value}"
+    text = str(value)
+    return text[:limit] if limit else text
+
+
+def render_invoice(order, pricing, fh):
+    """
+    Draw the invoice for order (priced lines from price_order) into fh.
+
+    invariant=1 keeps the output byte-for-byte stable for the same input,
+    so cached copies can be served with a strong ETag.
+    """
+    from reportlab.pdfgen import canvas
+
+    fonts = invoice_fonts()
+    p = canvas.Canvas(fh, pagesize=A4, invariant=1)
+
+    letterhead_bottom = _define_letterhead(p, fonts)
+    p.doForm(LETTERHEAD)
+
+    y = letterhead_bottom - 12
+    p.setFont(fonts.bold, 12)
+    p.drawString(LEFT, y, f"INVOICE - Order #{order.id}")
+    y -= 16
+
+    p.setFont(fonts.regular, 10)
+    p.drawString(LEFT, y, f"Customer: {order.customer_name}")
+    y -= ROW
+    p.drawString(LEFT, y, f"Phone: {order.phone}   WhatsApp: {order.whatsapp}")
+    y -= ROW
+    p.drawString(LEFT, y, f"Fulfillment: {order.get_fulfillment_display()}   Status: {order.status}")
+    y -= ROW
+
+    if order.address:
+        p.drawString(LEFT, y, f"Address: {order.address[:90]}")
+        y -= ROW
+
+    y = _table_header(p, fonts, y - 10)
+
+    # one text object per page for all rows, instead of one per drawString()
+    page = 1
+    rows = p.beginText()
+    rows.setFont(fonts.regular, 10)
+    for line in pricing:
+        if y < BOTTOM:
+            p.drawText(rows)
+            p.showPage()
+            page += 1
+            p.doForm(LETTERHEAD)
+            p.setFont(fonts.bold, 10)
+            p.drawString(LEFT, letterhead_bottom - 12, f"INVOICE - Order #{order.id} (page {page})")
+            y = _table_header(p, fonts, letterhead_bottom - 32)
+            rows = p.beginText()
+            rows.setFont(fonts.regular, 10)
+
+        for _, x, attr, limit in COLUMNS:
+            rows.setTextOrigin(x, y)
+            rows.textOut(_cell(line, attr, limit, fonts))
+        y -= ROW
+    p.drawText(rows)
+
+    if y < BOTTOM + 40:
+        # keep the total off the page edge
+        p.showPage()
+        p.doForm(LETTERHEAD)
+        y = letterhead_bottom - 12
+
+    y -= 10
+    p.line(LEFT, y, RIGHT, y)
+    y -= 18
+
+    p.setFont(fonts.bold, 12)
+    p.drawString(350, y, f"TOTAL: {fonts.rupee} {pricing.total}")
+
+    y -= 28
+    p.setFont(fonts.regular, 10)
+    p.drawString(LEFT, y, f"Thank you for shopping with {SHOP_NAME}!")
+
+    p.showPage()
+    p.save()
@@ -0,0 +1,107 @@
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, IntegerField, Sum, Value, When, Window,
+)
+
+from catalog.models import Product
+from . import summaries
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+
+class PricedLine(NamedTuple):
+    product_id: int
+    name: str
+    qty: int
+    price: Decimal
+    subtotal: Decimal
+
+
+class PricedCart:
+    """Priced lines plus their total, as returned by price_cart()/price_order()."""
+
+    __slots__ = ("lines", "total", "products")
+
+    def __init__(self, lines, total=ZERO, products=None):
+        self.lines = lines
+        self.total = total
+        self.products = products or {}
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __bool__(self):
+        return bool(self.lines)
+
+    @property
+    def quantities(self):
+        return {line.product_id: line.qty for line in self.lines}
+
+
+def price_cart(cart):
+    """
+    Price a {product_id: qty} cart in one query: line subtotals and the
+    grand total are computed by the database.
+    """
+    quantities = {}
+    for pid, qty in cart.items():
+        try:
+            qty = int(qty)
+        except (ValueError, TypeError):
+            continue
+        if qty > 0:
+            quantities[int(pid)] = qty
+
+    if not quantities:
+        return PricedCart([])
+
+    qty = Case(
+        *[When(id=pid, then=Value(q)) for pid, q in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    subtotal = ExpressionWrapper(F("price") * qty, output_field=MONEY)
+
+    products = (
+        Product.objects.filter(id__in=quantities)
+        .annotate(qty=qty, subtotal=subtotal, total=Window(Sum(subtotal)))
+        .order_by("id")
+    )
+
+    lines = []
+    total = ZERO
+    for p in products:
+        # SQLite hands computed decimals back unscaled ("10" for 10.00)
+        lines.append(PricedLine(p.id, p.name, p.qty, p.price, p.subtotal.quantize(CENT)))
+        # every row carries the same window total
+        total = p.total.quantize(CENT)
+    return PricedCart(lines, total, products={p.id: p for p in products})
+
+
+def price_order(order):
+    """
+    Lines of a placed order, read from the snapshots taken at checkout
+    (no join to Product), with the order's stored total. Comes from the
+    order's summary without a query when it has one; otherwise uses
+    prefetch_related("items") when the caller already loaded them.
+    """
+    prefetched = getattr(order, "_prefetched_objects_cache", {}).get("items")
+    if summaries.is_current(order.summary):
+        items = summaries.lines(order.summary)
+    elif prefetched is not None:
+        items = [
+            (it.product_id, it.product_name, it.qty, it.unit_price, it.line_total)
+            for it in sorted(prefetched, key=lambda it: it.id)
+        ]
+    else:
+        items = order.items.order_by("id").values_list(
+            "product_id", "product_name", "qty", "unit_price", "line_total"
+        )
+    return PricedCart([PricedLine(*row) for row in items], order.total)
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Order, OrderItem
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_invoice(sender, instance, **kwargs):
+    # the summary no longer matches the items; readers use the items until
+    # the next refresh_totals() (the admin runs one after saving the inline)
+    Order.objects.filter(pk=instance.order_id).bump_revision(summary={})
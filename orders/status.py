@@ -0,0 +1,77 @@
+"""
+The order status state machine.
+
+TRANSITIONS lists where each status may go: forward through the pipeline
+(steps may be skipped, e.g. a pickup order goes from Packed straight to
+Delivered) or to Cancelled; Delivered and Cancelled are final. transition()
+moves a whole queryset at once: one UPDATE, one bulk INSERT of history rows
+and one of outbox messages, in a single transaction.
+"""
+from typing import NamedTuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import notifications
+from .models import Order, OrderStatusChange
+
+TRANSITIONS = {
+    "New": ("Confirmed", "Packed", "Out for Delivery", "Delivered", "Cancelled"),
+    "Confirmed": ("Packed", "Out for Delivery", "Delivered", "Cancelled"),
+    "Packed": ("Out for Delivery", "Delivered", "Cancelled"),
+    "Out for Delivery": ("Delivered", "Cancelled"),
+    "Delivered": (),
+    "Cancelled": (),
+}
+
+# The Order field stamped when an order enters each status ("New" is created_at)
+TIMESTAMP_FIELDS = {
+    "Confirmed": "confirmed_at",
+    "Packed": "packed_at",
+    "Out for Delivery": "out_for_delivery_at",
+    "Delivered": "delivered_at",
+    "Cancelled": "cancelled_at",
+}
+
+
+def can_transition(current, status):
+    return status in TRANSITIONS.get(current, ())
+
+
+def sources(status):
+    """The statuses an order can move to status from."""
+    return [current for current, targets in TRANSITIONS.items() if status in targets]
+
+
+class TransitionResult(NamedTuple):
+    changed: int
+    # already in the target status, or in one it can't be reached from
+    skipped: int
+
+
+def transition(orders, status, user=None):
+    """
+    Move every order in the queryset that may go to status there, stamping
+    its timestamp, invalidating its invoice, recording the change and
+    queueing a WhatsApp message to the customer. The rest are left alone.
+    """
+    if status not in TIMESTAMP_FIELDS:
+        raise ValueError(f"Orders can't be moved to {status!r}.")
+
+    now = timezone.now()
+    with transaction.atomic():
+        # locked on Postgres until commit; SQLite's IMMEDIATE transactions already serialize
+        rows = list(orders.select_for_update().values_list("id", "status", "whatsapp"))
+        movable = [row for row in rows if can_transition(row[1], status)]
+        if not movable:
+            return TransitionResult(0, len(rows))
+
+        Order.objects.filter(id__in=[order_id for order_id, _, _ in movable]).bump_revision(
+            status=status, **{TIMESTAMP_FIELDS[status]: now},
+        )
+        OrderStatusChange.objects.bulk_create([
+            OrderStatusChange(order_id=order_id, from_status=current, to_status=status, changed_at=now, changed_by=user)
+            for order_id, current, _ in movable
+        ])
+        notifications.enqueue_status_changes([(order_id, whatsapp) for order_id, _, whatsapp in movable], status)
+    return TransitionResult(len(movable), len(rows) - len(movable))
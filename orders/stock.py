@@ -0,0 +1,135 @@
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import F
+
+from catalog.models import Product
+from catalog.version import bump_catalog_version
+from . import summaries
+from .models import OrderItem
+
+# How many times a partial fill re-reads stock after losing a race
+MAX_PARTIAL_RETRIES = 5
+
+
+class ReservedLine(NamedTuple):
+    product_id: int
+    requested: int
+    filled: int
+
+    @property
+    def is_partial(self):
+        return 0 < self.filled < self.requested
+
+    @property
+    def is_empty(self):
+        return self.filled == 0
+
+
+class Reservation:
+    """
+    Result of reserve_stock(): one ReservedLine per requested product,
+    in product id order.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    @property
+    def filled_lines(self):
+        return [line for line in self.lines if line.filled > 0]
+
+    @property
+    def any_filled(self):
+        return any(line.filled > 0 for line in self.lines)
+
+    @property
+    def shortfalls(self):
+        return [line for line in self.lines if line.filled < line.requested]
+
+    def create_order(self, order, products):
+        """
+        Save order with its totals and summary and bulk-create the filled lines,
+        snapshotting name and price from products ({product_id: Product}).
+        """
+        items = []
+        for line in self.filled_lines:
+            product = products[line.product_id]
+            items.append(OrderItem(
+                order=order,
+                product=product,
+                qty=line.filled,
+                product_name=product.name,
+                unit_price=product.price,
+                line_total=product.price * line.filled,
+            ))
+
+        order.total = sum((item.line_total for item in items), Decimal("0.00"))
+        order.item_count = sum(item.qty for item in items)
+        order.summary = summaries.build(order.user.username, [
+            (item.product_id, item.product_name, item.qty, item.unit_price, item.line_total) for item in items
+        ])
+        order.save()
+        OrderItem.objects.bulk_create(items)
+        return order
+
+
+def _take(product_id, qty):
+    """
+    Decrement stock for one product without reading it into Python first.
+    Returns the quantity actually taken (may be less than qty).
+    """
+    products = Product.objects.filter(id=product_id)
+
+    # Fast path: whole line is available -> one conditional UPDATE
+    if products.filter(stock_quantity__gte=qty).update(
+        stock_quantity=F("stock_quantity") - qty
+    ):
+        return qty
+
+    # Partial fill: take whatever is left, guarded by the value we saw
+    for _ in range(MAX_PARTIAL_RETRIES):
+        available = products.values_list("stock_quantity", flat=True).first()
+        if not available:
+            return 0
+
+        take = min(qty, available)
+        if products.filter(stock_quantity__gte=take).update(
+            stock_quantity=F("stock_quantity") - take
+        ):
+            return take
+
+    return 0
+
+
+def reserve_stock(requested):
+    """
+    Reserve stock for {product_id: qty} and return a Reservation.
+
+    Every decrement is a conditional UPDATE, so two checkouts racing for
+    the same product can never push stock_quantity below zero. Products
+    are locked in id order to keep concurrent reservations from deadlocking
+    on databases with row locks.
+
+    Must be called inside transaction.atomic() together with the order
+    creation, so a failed checkout gives the stock back. The UPDATEs send
+    no signals, so once stock was taken and the transaction commits, the
+    catalog version is bumped here: cached pages show the new stock.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        raise RuntimeError("reserve_stock() must run inside transaction.atomic()")
+
+    lines = []
+    for product_id, qty in sorted((int(pid), int(q)) for pid, q in requested.items()):
+        if qty <= 0:
+            continue
+        lines.append(ReservedLine(product_id, qty, _take(product_id, qty)))
+
+    reservation = Reservation(lines)
+    if reservation.any_filled:
+        transaction.on_commit(bump_catalog_version)
+    return reservation
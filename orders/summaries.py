@@ -0,0 +1,33 @@
+"""
+Order summaries: what order_success, the invoice page and the invoice PDF
+show that isn't a column of the order itself -- the customer's username and
+the lines -- kept on Order.summary as compact JSON, so those pages read one
+order row with no join to auth_user or orderitem.
+
+Written at checkout, rebuilt by Order.refresh_totals() (the admin calls it
+on every save) and cleared when an item changes anywhere else; readers fall
+back to the items while it is empty.
+"""
+from decimal import Decimal
+
+# Bump when the layout below changes; older summaries then read as missing
+VERSION = 1
+
+
+def build(customer, lines):
+    """A summary from the username and (product_id, name, qty, unit price, line total) rows."""
+    return {
+        "v": VERSION,
+        "customer": customer,
+        # lists, not objects: the keys would be most of the bytes
+        "lines": [[pid, name, qty, str(price), str(total)] for pid, name, qty, price, total in lines],
+    }
+
+
+def is_current(summary):
+    return bool(summary) and summary.get("v") == VERSION
+
+
+def lines(summary):
+    """The summary's rows back as (product_id, name, qty, unit price, line total) with Decimals."""
+    return [(pid, name, qty, Decimal(price), Decimal(total)) for pid, name, qty, price, total in summary["lines"]]
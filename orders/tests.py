@@ -1,3 +1,885 @@
-from django.test import TestCase
+import io
+import multiprocessing
+import re
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import OperationalError, connection, transaction
+from django.db.models import QuerySet
+from django.contrib.admin.sites import site
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomerProfile
+from catalog.models import Brand, Category, Product
+from catalog.version import get_catalog_version
+from core.pagination import CappedCountPaginator
+from core.testing import TEST_STORAGES, QueryBudgetMixin, seed_catalog, seed_orders
+from . import invoices, notifications, summaries
+from .cart import CART_COOKIE, COOKIE_MAX_BYTES, decode, encode
+from .export import export_invoices
+from .pdf import invoice_fonts, render_invoice
+from .models import Order, OrderItem, OrderStatusChange, OutboxMessage
+from .pricing import PricedCart, PricedLine, price_cart, price_order
+from .status import TransitionResult, transition
+from .stock import reserve_stock
+
+
+def admin_action(name, queryset, user=None):
+    """Run an OrderAdmin action on queryset as user; returns the messages it showed."""
+    request = RequestFactory().post("/admin/orders/order/")
+    request.user = user
+    request._messages = CookieStorage(request)
+    getattr(site._registry[Order], name)(request, queryset)
+    return [str(m) for m in request._messages]
+
+
+def make_product(name="Pen", price="10.00", stock=10):
+    brand, _ = Brand.objects.get_or_create(name="Cello")
+    category, _ = Category.objects.get_or_create(name="Pens")
+    return Product.objects.create(
+        brand=brand, category=category, name=name, price=Decimal(price), stock_quantity=stock
+    )
+
+
+class ReserveStockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+        self.pen = make_product("Pen", stock=5)
+        self.book = make_product("Notebook", stock=2)
+
+    def test_full_fill_decrements_stock(self):
+        with transaction.atomic():
+            reservation = reserve_stock({self.pen.id: 3, str(self.book.id): 2})
+
+        self.assertEqual([(l.requested, l.filled) for l in reservation], [(3, 3), (2, 2)])
+        self.assertEqual(reservation.shortfalls, [])
+        self.pen.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(self.pen.stock_quantity, 2)
+        self.assertEqual(self.book.stock_quantity, 0)
+
+    def test_partial_and_empty_fills_are_reported(self):
+        self.book.stock_quantity = 0
+        self.book.save()
+
+        with transaction.atomic():
+            reservation = reserve_stock({self.pen.id: 8, self.book.id: 1})
+
+        pen_line, book_line = reservation.lines
+        self.assertTrue(pen_line.is_partial)
+        self.assertEqual(pen_line.filled, 5)
+        self.assertTrue(book_line.is_empty)
+        self.assertEqual(len(reservation.shortfalls), 2)
+        self.pen.refresh_from_db()
+        self.assertEqual(self.pen.stock_quantity, 0)
+
+    def test_taking_stock_bumps_the_catalog_version_on_commit(self):
+        before = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                reserve_stock({self.book.id: 5})
+        self.assertEqual(get_catalog_version(), before + 1)
+
+        # nothing taken, nothing cached went stale
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                reserve_stock({self.book.id: 1})
+        self.assertEqual(callbacks, [])
+
+    def test_create_order_snapshots_lines_in_one_insert(self):
+        products = {self.pen.id: self.pen, self.book.id: self.book}
+        with transaction.atomic():
+            reservation = reserve_stock({self.pen.id: 2, self.book.id: 1})
+            # one INSERT for the order, one bulk INSERT for its items
+            with self.assertNumQueries(2):
+                order = reservation.create_order(Order(user=self.user), products)
+
+        self.assertEqual(order.total, Decimal("30.00"))
+        self.assertEqual(order.item_count, 3)
+        self.assertEqual(
+            list(order.items.order_by("id").values_list("product_name", "unit_price", "line_total")),
+            [("Pen", Decimal("10.00"), Decimal("20.00")), ("Notebook", Decimal("10.00"), Decimal("10.00"))],
+        )
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        self.pen = make_product("Pen", price="12.34")
+        self.book = make_product("Notebook", price="45.00")
+
+    def test_price_cart_in_one_query(self):
+        with self.assertNumQueries(1):
+            pricing = price_cart({str(self.pen.id): 3, str(self.book.id): "2", "999": 0})
+
+        self.assertEqual([(l.name, l.qty, l.subtotal) for l in pricing], [
+            ("Pen", 3, Decimal("37.02")),
+            ("Notebook", 2, Decimal("90.00")),
+        ])
+        self.assertEqual(pricing.total, Decimal("127.02"))
+        self.assertEqual(pricing.quantities, {self.pen.id: 3, self.book.id: 2})
+
+    def test_empty_cart_skips_query(self):
+        with self.assertNumQueries(0):
+            pricing = price_cart({})
+        self.assertFalse(pricing)
+        self.assertEqual(pricing.total, Decimal("0.00"))
+
+    def test_price_order_reads_snapshots(self):
+        user = User.objects.create_user("ravi", password="pw")
+        order = Order.objects.create(user=user)
+        OrderItem.objects.create(order=order, product=self.pen, qty=3)
+        OrderItem.objects.create(order=order, product=self.book, qty=2)
+        order.refresh_totals()
+        self.assertEqual(order.total, price_cart({self.pen.id: 3, self.book.id: 2}).total)
+
+        # later price edits must not rewrite the invoice
+        Product.objects.filter(id=self.pen.id).update(price=Decimal("99.00"), name="Renamed")
+
+        # from the summary refresh_totals() stored, then from the items once it is cleared
+        with self.assertNumQueries(0):
+            from_summary = price_order(order)
+        order.summary = {}
+        with self.assertNumQueries(1):
+            pricing = price_order(order)
+
+        self.assertEqual(from_summary.lines, pricing.lines)
+        self.assertEqual(pricing.lines[0].name, "Pen")
+        self.assertEqual(pricing.lines[0].subtotal, Decimal("37.02"))
+        self.assertEqual(pricing.total, Decimal("127.02"))
+
+    def test_switching_an_items_product_takes_a_new_snapshot(self):
+        order = Order.objects.create(user=User.objects.create_user("ravi", password="pw"))
+        OrderItem.objects.create(order=order, product=self.pen, qty=2)
+
+        item = OrderItem.objects.get()
+        item.qty = 3
+        item.save()
+        self.assertEqual((item.product_name, item.unit_price), ("Pen", Decimal("12.34")))
+
+        item = OrderItem.objects.get()
+        item.product = self.book
+        item.save()
+        order.refresh_totals()
+
+        item.refresh_from_db()
+        self.assertEqual((item.product_name, item.unit_price, item.line_total), ("Notebook", Decimal("45.00"), Decimal("135.00")))
+        self.assertEqual(order.total, Decimal("135.00"))
+        self.assertEqual(price_order(order).lines[0].name, "Notebook")
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+        self.client.force_login(self.user)
+        self.pen = make_product("Pen", stock=2)
+        self.book = make_product("Notebook", stock=0)
+
+    def set_cart(self, cart):
+        session = self.client.session
+        session["cart"] = {str(pid): qty for pid, qty in cart.items()}
+        session.save()
+
+    def post_checkout(self):
+        return self.client.post("/checkout/", {
+            "fulfillment": "pickup",
+            "phone": "9440574394",
+            "whatsapp": "9440574394",
+        })
+
+    def test_partial_fill_creates_order_and_warns(self):
+        self.set_cart({self.pen.id: 3, self.book.id: 1})
+
+        response = self.post_checkout()
+
+        order = Order.objects.get()
+        self.assertRedirects(response, f"/order/success/{order.id}/", fetch_redirect_response=False)
+        self.assertEqual(list(order.items.values_list("product_id", "qty")), [(self.pen.id, 2)])
+        texts = [str(m) for m in response.wsgi_request._messages]
+        self.assertIn("Only 2 of 3 × Pen were available.", texts)
+        self.assertIn("Notebook is out of stock and was not added to your order.", texts)
+
+    def test_nothing_in_stock_creates_no_order(self):
+        self.set_cart({self.book.id: 1})
+
+        response = self.post_checkout()
+
+        self.assertRedirects(response, "/cart/", fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+
+    def test_summary_is_stored_and_follows_item_edits(self):
+        self.set_cart({self.pen.id: 2})
+        self.post_checkout()
+
+        order = Order.objects.get()
+        self.assertEqual(order.summary["customer"], "ravi")
+        self.assertEqual(price_order(order).lines, [PricedLine(self.pen.id, "Pen", 2, Decimal("10.00"), Decimal("20.00"))])
+
+        # an item edit outside the admin clears the summary; pages read the items instead
+        item = order.items.get()
+        item.qty = 1
+        item.save()
+        order.refresh_from_db()
+        self.assertEqual(order.summary, {})
+        self.assertContains(self.client.get(f"/order/success/{order.id}/"), "Pen × 1")
+
+        # what the admin runs after saving the inline
+        order.refresh_totals()
+        order.refresh_from_db()
+        self.assertEqual(summaries.lines(order.summary), [(self.pen.id, "Pen", 1, Decimal("10.00"), Decimal("10.00"))])
+        self.assertEqual(order.total, Decimal("10.00"))
+
+
+class CartStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+        self.client.force_login(self.user)
+        self.pen = make_product("Pen")
+
+    def session_writes(self, queries):
+        return [q for q in queries if q["sql"].startswith("UPDATE") and "django_session" in q["sql"]]
+
+    def test_encoding_round_trip_ignores_garbage(self):
+        self.assertEqual(encode({"12": 3, "45": 1}), "12:3|45:1")
+        self.assertEqual(decode("12:3|45:1"), {"12": 3, "45": 1})
+        self.assertEqual(decode("12:x|:4|7|x:1|9:0|3:2"), {"3": 2})
+
+    def test_cookie_store_skips_the_session_write(self):
+        with self.assertNumQueries(4):  # session + user reads per request, no writes
+            self.client.get(f"/cart/add/{self.pen.id}/")
+            self.client.post(f"/cart/update/{self.pen.id}/", {"qty": "4"})
+
+        self.assertIn(CART_COOKIE, self.client.cookies)
+        response = self.client.get(f"/cart/add/{self.pen.id}/")
+        self.assertEqual(response.wsgi_request.session.get("cart"), None)
+
+        self.client.get(f"/cart/remove/{self.pen.id}/")
+        self.assertEqual(self.client.cookies[CART_COOKIE].value, "")
+
+    @override_settings(CART_STORE="session")
+    def test_session_store(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/cart/add/{self.pen.id}/")
+        self.assertEqual(len(self.session_writes(queries)), 1)
+        self.assertEqual(response.wsgi_request.session["cart"], {str(self.pen.id): 1})
+        self.assertNotIn(CART_COOKIE, self.client.cookies)
+
+    def test_cookie_is_bound_to_the_user(self):
+        self.client.get(f"/cart/add/{self.pen.id}/")
+        self.client.force_login(User.objects.create_user("sita"))
+        response = self.client.get(f"/cart/add/{self.pen.id}/")
+        # ravi's cookie does not verify for sita, so her cart starts empty
+        self.assertTrue(response.cookies[CART_COOKIE].value.startswith(f"{self.pen.id}:1:"))
+
+    def test_large_cart_falls_back_to_the_session_and_back(self):
+        lines = COOKIE_MAX_BYTES // len(f"{self.pen.id}00000:1|") + 1
+        session = self.client.session
+        session["cart"] = {str(100000 + i): 1 for i in range(lines)}
+        session.save()
+
+        response = self.client.get(f"/cart/add/{self.pen.id}/")
+        self.assertEqual(len(response.wsgi_request.session["cart"]), lines + 1)
+        self.assertEqual(response.cookies[CART_COOKIE].value, "")
+
+        for i in range(lines):
+            self.client.get(f"/cart/remove/{100000 + i}/")
+        response = self.client.get(f"/cart/add/{self.pen.id}/")
+        self.assertNotIn("cart", response.wsgi_request.session)
+        self.assertTrue(response.cookies[CART_COOKIE].value.startswith(f"{self.pen.id}:2:"))
+
+
+class CartApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+        self.client.force_login(self.user)
+        self.pen = make_product("Pen", price="10.00")
+        self.book = make_product("Notebook", price="45.50")
+
+    def test_add_update_remove_return_line_and_totals(self):
+        with self.assertNumQueries(3):  # session, user, one pricing query
+            data = self.client.post(f"/cart/api/add/{self.pen.id}/").json()
+        self.assertEqual(data["line"], {
+            "product_id": self.pen.id, "name": "Pen", "qty": 1, "price": "10.00", "subtotal": "10.00",
+        })
+
+        self.client.post(f"/cart/api/add/{self.book.id}/")
+        data = self.client.post(f"/cart/api/update/{self.pen.id}/", {"qty": "3"}).json()
+        self.assertEqual(data["line"]["subtotal"], "30.00")
+        self.assertEqual(data["cart"], {"lines": 2, "quantity": 4, "total": "75.50"})
+
+        data = self.client.post(f"/cart/api/remove/{self.pen.id}/").json()
+        self.assertIsNone(data["line"])
+        self.assertEqual(data["cart"], {"lines": 1, "quantity": 1, "total": "45.50"})
+
+        data = self.client.post(f"/cart/api/update/{self.book.id}/", {"qty": "0"}).json()
+        self.assertEqual(data["cart"]["lines"], 0)
+
+    def test_bulk_set(self):
+        self.client.post(f"/cart/api/add/{self.pen.id}/")
+        response = self.client.post(
+            "/cart/api/set/",
+            data={"items": {str(self.pen.id): 0, str(self.book.id): 2, "999": 1}},
+            content_type="application/json",
+        )
+        data = response.json()
+        self.assertEqual([l["product_id"] for l in data["lines"]], [self.book.id])
+        self.assertEqual(data["unknown"], [999])
+        self.assertEqual(data["cart"]["total"], "91.00")
+
+        # the unknown product was not kept
+        data = self.client.post(f"/cart/api/add/{self.pen.id}/").json()
+        self.assertEqual(data["cart"]["lines"], 2)
+
+    def test_errors(self):
+        self.assertEqual(self.client.post("/cart/api/add/999/").status_code, 404)
+        self.assertEqual(self.client.post(f"/cart/api/update/{self.pen.id}/", {"qty": "x"}).status_code, 400)
+        self.assertEqual(self.client.post("/cart/api/set/", data="[]", content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.get(f"/cart/api/add/{self.pen.id}/").status_code, 405)
+
+        self.client.logout()
+        self.assertEqual(self.client.post(f"/cart/api/add/{self.pen.id}/").status_code, 401)
+
+    def test_csrf_is_enforced(self):
+        client = self.client_class(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        self.assertEqual(client.post(f"/cart/api/add/{self.pen.id}/").status_code, 403)
+
+        token = "a" * 32
+        client.cookies["csrftoken"] = token
+        response = client.post(f"/cart/api/add/{self.pen.id}/", HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+
+class TempInvoiceStorageMixin:
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        storages = {
+            "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            "invoices": {
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": self.cache_dir},
+            },
+        }
+        override = override_settings(STORAGES=storages)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class InvoicePdfCacheTests(TempInvoiceStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("ravi", password="pw")
+        self.client.force_login(self.user)
+        self.order = Order.objects.create(user=self.user, phone="9440574394")
+        OrderItem.objects.create(order=self.order, product=make_product("Pen"), qty=2)
+        self.url = f"/order/{self.order.id}/invoice/pdf/"
+
+    def download(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b"".join(response.streaming_content) if response.status_code == 200 else b""
+        return response, body
+
+    def test_pdf_is_cached_and_revalidated(self):
+        first, body = self.download()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(body.startswith(b"%PDF"))
+        self.assertIn("private", first["Cache-Control"])
+
+        with mock.patch.object(invoices, "render_invoice") as render:
+            second, again = self.download()
+            not_modified, _ = self.download(if_none_match=first["ETag"])
+        render.assert_not_called()
+        self.assertEqual(again, body)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_admin_action_and_item_edit_invalidate(self):
+        first, _ = self.download()
+
+        admin_action("mark_packed", Order.objects.filter(id=self.order.id))
+        after_action, _ = self.download(if_none_match=first["ETag"])
+        self.assertEqual(after_action.status_code, 200)
+        self.assertNotEqual(after_action["ETag"], first["ETag"])
+
+        item = self.order.items.get()
+        item.qty = 5
+        item.save()
+        after_edit, _ = self.download(if_none_match=after_action["ETag"])
+        self.assertEqual(after_edit.status_code, 200)
+
+        # only the current revision stays on disk
+        _, files = invoices.storage().listdir(f"order_{self.order.id}")
+        self.assertEqual(len(files), 1)
+
+    def test_other_users_get_404(self):
+        self.client.force_login(User.objects.create_user("other", password="pw"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class InvoiceRendererTests(SimpleTestCase):
+    def test_long_invoice_reuses_letterhead_form_on_every_page(self):
+        order = Order(id=7, user=User(username="ravi"), status="New")
+        lines = [PricedLine(i, f"Item {i}", 1, Decimal("5.00"), Decimal("5.00")) for i in range(120)]
+
+        buf = io.BytesIO()
+        render_invoice(order, PricedCart(lines, Decimal("600.00")), buf)
+        pdf = buf.getvalue()
+
+        pages = pdf.count(b"/Type /Page\n")
+        self.assertGreater(pages, 1)
+        # every page points at the same letterhead XObject
+        refs = re.findall(rb"/FormXob\.letterhead (\d+) 0 R", pdf)
+        self.assertEqual(len(refs), pages)
+        self.assertEqual(len(set(refs)), 1)
+        # the font shipped in orders/fonts
+        self.assertEqual(invoice_fonts().rupee, "₹")
+        self.assertIn(b"DejaVuSans", pdf)
+
+    def test_missing_font_falls_back_with_a_warning(self):
+        invoice_fonts.cache_clear()
+        self.addCleanup(invoice_fonts.cache_clear)
+        with override_settings(INVOICE_FONT_PATH="/nonexistent/Sans.ttf"), mock.patch("orders.pdf.FONT_CANDIDATES", ()):
+            with self.assertLogs("orders.pdf", "WARNING"):
+                self.assertEqual(invoice_fonts().rupee, "Rs.")
+
+
+class ExportInvoicesTests(TempInvoiceStorageMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user("ravi", password="pw")
+        pen = make_product("Pen")
+        self.orders = []
+        for qty in (1, 2, 3):
+            order = Order.objects.create(user=user)
+            OrderItem.objects.create(order=order, product=pen, qty=qty)
+            self.orders.append(order)
+
+    def test_zip_has_one_pdf_per_order_and_reuses_cache(self):
+        if multiprocessing.current_process().daemon:
+            self.skipTest("the parallel test runner's workers can't start a process pool")
+        invoices.get_or_render(Order.objects.get(id=self.orders[0].id))
+
+        buf = io.BytesIO()
+        # spawned, never forked from a (possibly multi-threaded) web worker
+        with mock.patch.object(ProcessPoolExecutor, "__init__", autospec=True, side_effect=ProcessPoolExecutor.__init__) as init:
+            stats = export_invoices(Order.objects.all(), buf, workers=2)
+        self.assertEqual(init.call_args.kwargs["mp_context"].get_start_method(), "spawn")
+
+        self.assertEqual((stats.count, stats.cached, stats.rendered), (3, 1, 2))
+        self.assertGreater(stats.per_second, 0)
+        with zipfile.ZipFile(buf) as zf:
+            names = sorted(zf.namelist())
+            self.assertEqual(names, sorted(f"invoice_order_{o.id}.pdf" for o in self.orders))
+            for name in names:
+                self.assertTrue(zf.read(name).startswith(b"%PDF"))
+
+    def test_admin_action_uses_few_workers_and_caps_the_orders(self):
+        with mock.patch("orders.admin.export_invoices", wraps=export_invoices) as export:
+            with mock.patch("orders.admin.EXPORT_WORKERS", 1):
+                shown = admin_action("export_invoice_zip", Order.objects.all())
+        self.assertEqual(export.call_args.kwargs["workers"], 1)
+        self.assertIn("Exported 3 invoices", shown[0])
+
+        with mock.patch("orders.admin.export_invoices") as export, mock.patch("orders.admin.EXPORT_MAX_ORDERS", 2):
+            shown = admin_action("export_invoice_zip", Order.objects.all())
+        export.assert_not_called()
+        self.assertIn("export_invoices management command", shown[0])
+
+    def test_management_command(self):
+        path = f"{self.cache_dir}/export.zip"
+        out = io.StringIO()
+        call_command("export_invoices", path, "--workers", "1", stdout=out)
+
+        self.assertIn("invoices/sec", out.getvalue())
+        with zipfile.ZipFile(path) as zf:
+            self.assertEqual(len(zf.namelist()), 3)
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """Many threads hammering the same hot products must never oversell."""
+
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 15
+
+    def test_no_oversell_under_contention(self):
+        hot = make_product("Hot Pen", stock=40)
+        warm = make_product("Warm Book", stock=25)
+        filled = {hot.id: 0, warm.id: 0}
+        lock = threading.Lock()
+        errors = []
+
+        def shopper():
+            try:
+                for _ in range(self.ATTEMPTS_PER_THREAD):
+                    while True:
+                        try:
+                            with transaction.atomic():
+                                reservation = reserve_stock({hot.id: 2, warm.id: 1})
+                            break
+                        except OperationalError:
+                            # SQLite reports lock contention instead of waiting; retry the checkout
+                            continue
+                    with lock:
+                        for line in reservation:
+                            filled[line.product_id] += line.filled
+            except Exception as exc:  # pragma: no cover - surfaced via errors below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=shopper) for _ in range(self.THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        hot.refresh_from_db()
+        warm.refresh_from_db()
+        self.assertEqual(hot.stock_quantity, 0)
+        self.assertEqual(warm.stock_quantity, 0)
+        self.assertEqual(filled, {hot.id: 40, warm.id: 25})
+
+
+class FlakySender:
+    """Fails the messages in errors ({id: exception}) and records the rest."""
+
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.sent = []
+
+    def send(self, message):
+        if message.id in self.errors:
+            raise self.errors[message.id]
+        self.sent.append(message)
+
+
+@override_settings(NOTIFICATION_SENDER="locmem")
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+        self.pen = make_product("Pen")
+        self.addCleanup(notifications.sent_messages.clear)
+
+    def queue(self, count):
+        orders = seed_orders(self.user, [self.pen], orders=count, items=1)
+        notifications.enqueue_status_changes([(o.id, o.whatsapp) for o in orders], "Packed")
+        return list(OutboxMessage.objects.order_by("id"))
+
+    def test_checkout_queues_the_shop_message_in_its_transaction(self):
+        self.client.force_login(self.user)
+        checkout = {"fulfillment": "pickup", "phone": "9440574394", "whatsapp": "9440574394"}
+
+        def set_cart():
+            session = self.client.session
+            session["cart"] = {str(self.pen.id): 2}
+            session.save()
+
+        set_cart()
+        self.client.post("/checkout/", checkout)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.kind, message.state, message.recipient), ("placed", "pending", "919440574394"))
+        self.assertIn("- Pen × 2", message.body)
+
+        # no message without the order, and no order without its message
+        Order.objects.all().delete()
+        set_cart()
+        with mock.patch.object(notifications, "enqueue_order_placed", side_effect=OperationalError("disk full")):
+            with self.assertRaises(OperationalError):
+                self.client.post("/checkout/", checkout)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_status_changes_queue_one_message_per_changed_order(self):
+        seed_orders(self.user, [self.pen], orders=2, items=1)
+        Order.objects.create(user=self.user, whatsapp="")  # nobody to tell
+
+        admin_action("mark_delivered", Order.objects.all())
+        self.assertEqual(Order.objects.filter(status="Delivered").count(), 3)
+        messages = OutboxMessage.objects.all()
+        self.assertEqual(len(messages), 2)
+        self.assertIn("has been Delivered", messages[0].body)
+
+        # already there: no update, no message
+        self.assertEqual(transition(Order.objects.all(), "Delivered"), TransitionResult(0, 3))
+        self.assertEqual(OutboxMessage.objects.count(), 2)
+
+    def test_drain_sends_and_retries_with_backoff(self):
+        ok, flaky, bad = self.queue(3)
+        sender = FlakySender({flaky.id: notifications.SendError("timeout"), bad.id: notifications.SendError("no such number", permanent=True)})
+
+        stats = notifications.drain(sender)
+        self.assertEqual((stats.claimed, stats.sent, stats.retried, stats.failed), (3, 1, 1, 1))
+        self.assertEqual([m.idempotency_key for m in sender.sent], [ok.idempotency_key])
+
+        ok.refresh_from_db(), flaky.refresh_from_db(), bad.refresh_from_db()
+        self.assertEqual((ok.state, ok.attempts), ("sent", 1))
+        self.assertEqual((bad.state, bad.last_error), ("failed", "SendError: no such number"))
+        self.assertEqual((flaky.state, flaky.attempts), ("pending", 1))
+        self.assertGreater(flaky.next_attempt_at, ok.sent_at + notifications.RETRY_BASE * 0.7)
+
+        # not due yet; once it is, it goes out under the same key
+        self.assertEqual(notifications.drain(sender).claimed, 0)
+        OutboxMessage.objects.filter(id=flaky.id).update(next_attempt_at=flaky.created_at)
+        sender.errors.clear()
+        self.assertEqual(notifications.drain(sender).sent, 1)
+        self.assertEqual(sender.sent[-1].idempotency_key, flaky.idempotency_key)
+
+    def test_gives_up_after_max_attempts(self):
+        message, = self.queue(1)
+        sender = FlakySender({message.id: RuntimeError("provider returned 500")})
+        with self.assertLogs("orders.notifications", "ERROR"):
+            for _ in range(3):
+                OutboxMessage.objects.filter(id=message.id).update(next_attempt_at=message.created_at)
+                notifications.drain(sender, max_attempts=3)
+
+        message.refresh_from_db()
+        self.assertEqual((message.state, message.attempts), ("failed", 3))
+
+    def test_only_failed_messages_can_be_sent_by_hand(self):
+        message, = self.queue(1)
+        outbox_admin = site._registry[OutboxMessage]
+        self.assertEqual(outbox_admin.send_by_hand(message), "-")
+
+        message.state = OutboxMessage.FAILED
+        self.assertIn(f"https://wa.me/{message.recipient}?text=Hi%21", outbox_admin.send_by_hand(message))
+
+    def test_claimed_messages_are_leased(self):
+        self.queue(2)
+        notifications._claim(1)
+        # a second worker only gets the unclaimed one
+        self.assertEqual(notifications.drain(FlakySender()).claimed, 1)
+
+    def test_command_drains_in_batches(self):
+        self.queue(5)
+        out = io.StringIO()
+        call_command("drain_outbox", "--batch-size", "2", stdout=out)
+
+        self.assertEqual(len(notifications.sent_messages), 5)
+        self.assertFalse(OutboxMessage.objects.exclude(state="sent").exists())
+        self.assertEqual(out.getvalue().count("claimed"), 3)
+
+
+class OrderStatusTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_superuser("admin", password="pw")
+        self.customer = User.objects.create_user("ravi", password="pw")
+        self.pen = make_product("Pen")
+
+    def test_bulk_transition_is_set_based(self):
+        orders = seed_orders(self.customer, [self.pen], orders=3, items=1)
+        Order.objects.filter(id=orders[2].id).update(status="Delivered")
+
+        # locking read, UPDATE, history INSERT, outbox INSERT (+ savepoint pair)
+        with self.assertNumQueries(6):
+            result = transition(Order.objects.all(), "Packed", user=self.staff)
+        self.assertEqual(result, TransitionResult(2, 1))
+
+        packed = Order.objects.filter(status="Packed").order_by("id")
+        self.assertEqual([o.id for o in packed], [orders[0].id, orders[1].id])
+        self.assertTrue(all(o.packed_at and o.revision == 2 for o in packed))
+        self.assertEqual(
+            list(OrderStatusChange.objects.order_by("order_id").values_list("order_id", "from_status", "to_status", "changed_by")),
+            [(orders[0].id, "New", "Packed", self.staff.id), (orders[1].id, "New", "Packed", self.staff.id)],
+        )
+
+        more = seed_orders(self.customer, [self.pen], orders=20, items=1)
+        with self.assertNumQueries(6):
+            transition(Order.objects.filter(id__in=[o.id for o in more]), "Confirmed")
+
+    def test_final_statuses_and_unknown_targets(self):
+        order, = seed_orders(self.customer, [self.pen], orders=1, items=1)
+        transition(Order.objects.all(), "Cancelled")
+        self.assertEqual(transition(Order.objects.all(), "Confirmed"), TransitionResult(0, 1))
+        with self.assertRaises(ValueError):
+            transition(Order.objects.all(), "New")
+
+    def test_admin_action_reports_skipped_orders(self):
+        seed_orders(self.customer, [self.pen], orders=2, items=1)
+        admin_action("mark_delivered", Order.objects.all()[:1], user=self.staff)
+
+        shown = admin_action("mark_out_for_delivery", Order.objects.all(), user=self.staff)
+        self.assertEqual(shown, ["1 order(s) marked Out for Delivery.", "1 order(s) skipped: already Out for Delivery or can't move there."])
+
+    def test_change_form_validates_and_records_the_transition(self):
+        order, = seed_orders(self.customer, [self.pen], orders=1, items=1)
+        self.client.force_login(self.staff)
+        url = f"/admin/orders/order/{order.id}/change/"
+        data = {
+            "user": self.customer.id, "fulfillment": "pickup", "phone": "9440574394", "whatsapp": "9440574394",
+            "address": "", "notes": "changed", "status": "Confirmed", "revision": order.revision,
+            "items-TOTAL_FORMS": 0, "items-INITIAL_FORMS": 0,
+            "status_changes-TOTAL_FORMS": 0, "status_changes-INITIAL_FORMS": 0,
+        }
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.notes), ("Confirmed", "changed"))
+        self.assertIsNotNone(order.confirmed_at)
+        change = order.status_changes.get()
+        self.assertEqual((change.from_status, change.changed_by), ("New", self.staff))
+        self.assertEqual(order.notifications.get().kind, "status")
+
+        # no going back
+        response = self.client.post(url, {**data, "status": "New"})
+        self.assertContains(response, "An order can&#x27;t go from Confirmed to New.")
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class OrdersQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ravi", password="pw")
+        CustomerProfile.objects.create(user=self.user, phone="9440574394")
+        self.client.force_login(self.user)
+        self.products = seed_catalog(40)
+        self.stocked = [p for p in self.products if p.stock_quantity > 2]
+
+    def add_to_cart(self, products):
+        for product in products:
+            self.client.post(f"/cart/api/add/{product.id}/")
+
+    def test_cart_pages(self):
+        self.add_to_cart(self.products[:2])
+        grow = lambda: self.add_to_cart(self.products[2:20])
+        # session, user, one pricing query
+        self.assertQueryBudget(lambda: self.client.get("/cart/"), 3, grow=grow)
+        self.assertQueryBudget(lambda: self.client.get("/checkout/"), 4, grow=grow)
+
+    def test_cart_mutations(self):
+        pid = self.products[0].id
+        self.assertQueryBudget(lambda: self.client.get(f"/cart/add/{pid}/"), 2)
+        self.assertQueryBudget(lambda: self.client.post(f"/cart/update/{pid}/", {"qty": "3"}), 2)
+        self.assertQueryBudget(lambda: self.client.get(f"/cart/remove/{pid}/"), 2)
+
+        grow = lambda: self.add_to_cart(self.products[1:20])
+        self.assertQueryBudget(lambda: self.client.post(f"/cart/api/add/{pid}/"), 3, grow=grow)
+        self.assertQueryBudget(lambda: self.client.post(f"/cart/api/update/{pid}/", {"qty": "4"}), 3, grow=grow)
+        self.assertQueryBudget(lambda: self.client.post(f"/cart/api/remove/{pid}/"), 3, grow=grow)
+        self.assertQueryBudget(
+            lambda: self.client.post("/cart/api/set/", {"items": {str(pid): 2}}, content_type="application/json"), 3,
+        )
+
+    def test_checkout_post_is_linear_only_in_stock_updates(self):
+        lines = self.stocked[:10]
+        self.add_to_cart(lines)
+        # fixed work (including the outbox INSERT) + one conditional stock UPDATE per line
+        self.assertQueryBudget(lambda: self.client.post("/checkout/", {
+            "fulfillment": "pickup", "phone": "9440574394", "whatsapp": "9440574394",
+        }), 13 + len(lines))
+        self.assertEqual(Order.objects.get().item_count, len(lines))
+
+    def test_order_pages_are_constant_in_item_count(self):
+        order = seed_orders(self.user, self.products, orders=1, items=2)[0]
+
+        def grow():
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=p, qty=1, product_name=p.name, unit_price=p.price, line_total=p.price)
+                for p in self.products[2:30]
+            ])
+
+        # session, user, and the order row: username and lines come from its summary
+        self.assertQueryBudget(lambda: self.client.get(f"/order/success/{order.id}/"), 3, grow=grow)
+        self.assertQueryBudget(lambda: self.client.get(f"/order/{order.id}/invoice/"), 3, grow=grow)
+
+    def test_invoice_pdf(self):
+        order = seed_orders(self.user, self.products, orders=1, items=30)[0]
+        url = f"/order/{order.id}/invoice/pdf/"
+        # session, user, the ETag's revision and the order; rendering reads its summary
+        self.assertQueryBudget(lambda: self.client.get(url), 4)
+        # cached artifact: no rendering
+        self.assertQueryBudget(lambda: self.client.get(url), 4)
+        etag = self.client.get(url)["ETag"]
+        self.assertQueryBudget(lambda: self.client.get(url, HTTP_IF_NONE_MATCH=etag), 3)
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class OrderAdminTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", password="pw"))
+        self.products = seed_catalog(30)
+
+    def add_orders(self, customers=3):
+        for i in range(customers):
+            user = User.objects.create_user(f"customer{User.objects.count()}")
+            seed_orders(user, self.products, orders=4, items=3)
+
+    def test_changelists_are_constant_in_row_count(self):
+        self.add_orders()
+        # session, user, capped count, rows (with the username), and the
+        # date hierarchy's min/max plus first/last/one probe
+        self.assertQueryBudget(lambda: self.client.get("/admin/orders/order/"), 9, grow=self.add_orders)
+        self.assertQueryBudget(lambda: self.client.get("/admin/orders/orderitem/"), 4, grow=self.add_orders)
+
+    def test_change_page_is_constant_in_item_count(self):
+        order = seed_orders(User.objects.create_user("ravi"), self.products, orders=1, items=2)[0]
+
+        def grow():
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=p, qty=1, product_name=p.name, unit_price=p.price, line_total=p.price)
+                for p in self.products[2:20]
+            ])
+
+        url = f"/admin/orders/order/{order.id}/change/"
+        self.client.get(url)  # fills the per-process ContentType cache
+        # session, user, order with its user, items, status history, the user field's label
+        self.assertQueryBudget(lambda: self.client.get(url), 6, grow=grow)
+
+    def test_datetimes_matches_the_stock_queryset(self):
+        self.add_orders(1)
+        stamps = [datetime(2024, 12, 31, 23, 30), datetime(2025, 1, 1), datetime(2025, 1, 15), datetime(2025, 3, 2)]
+        for order, stamp in zip(Order.objects.order_by("id"), stamps):
+            Order.objects.filter(id=order.id).update(created_at=stamp.replace(tzinfo=dt_timezone.utc))
+
+        for kind in ("year", "month", "day"):
+            for order in ("ASC", "DESC"):
+                queryset = Order.objects.filter(status="New")
+                self.assertEqual(
+                    list(queryset.datetimes("created_at", kind, order)),
+                    list(QuerySet.datetimes(queryset, "created_at", kind, order)),
+                )
+        self.assertEqual(Order.objects.none().datetimes("created_at", "year"), [])
+
+    def test_search_by_phone_prefix_or_suffix(self):
+        ravi = Order.objects.create(user=User.objects.create_user("ravi"), phone="+91 94405 74394", whatsapp="")
+        sita = Order.objects.create(user=User.objects.create_user("sita"), phone="", whatsapp="07386034104")
+        self.assertEqual(ravi.phone_digits, "9440574394")
+        self.assertEqual(sita.whatsapp_digits_rev, "4014306837")
+
+        def found(term):
+            response = self.client.get("/admin/orders/order/", {"q": term})
+            return {order.id for order in response.context["cl"].result_list}
+
+        self.assertEqual(found("9440574394"), {ravi.id})
+        self.assertEqual(found("+91 94405"), {ravi.id})
+        self.assertEqual(found("4394"), {ravi.id})
+        self.assertEqual(found("73860"), {sita.id})
+        self.assertEqual(found("4104"), {sita.id})
+        self.assertEqual(found("sita"), {sita.id})
+        self.assertEqual(found("5555"), set())
+
+        sita.whatsapp = "9440512345"
+        sita.save(update_fields=["whatsapp"])
+        self.assertEqual(found("94405"), {ravi.id, sita.id})
+
+        # a username that is itself a phone number is found too
+        numbered = Order.objects.create(user=User.objects.create_user("9848022338"), phone="", whatsapp="")
+        self.assertEqual(found("9848022338"), {numbered.id})
+        self.assertEqual(found("98480"), {numbered.id})
+
+    def test_paginator_count_is_capped(self):
+        self.add_orders()
+        with mock.patch.object(CappedCountPaginator, "count_cap", 5):
+            paginator = CappedCountPaginator(Order.objects.order_by("-id"), 2)
+            self.assertEqual(paginator.count, 5)
+            self.assertEqual(paginator.num_pages, 3)
@@ -7,6 +7,11 @@ urlpatterns = [
     path("cart/update/<int:product_id>/", views.cart_update, name="cart_update"),
     path("cart/remove/<int:product_id>/", views.cart_remove, name="cart_remove"),
 
+    path("cart/api/add/<int:product_id>/", views.cart_api_add, name="cart_api_add"),
+    path("cart/api/update/<int:product_id>/", views.cart_api_update, name="cart_api_update"),
+    path("cart/api/remove/<int:product_id>/", views.cart_api_remove, name="cart_api_remove"),
+    path("cart/api/set/", views.cart_api_set, name="cart_api_set"),
+
     path("checkout/", views.checkout, name="checkout"),
     path("order/success/<int:order_id>/", views.order_success, name="order_success"),
 
@@ -1,23 +1,23 @@
-from decimal import Decimal
+import json
 import urllib.parse
+from functools import wraps
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import FileResponse, JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-
-from catalog.models import Product
 from accounts.models import CustomerProfile
+from core.phone import digits_only
+from . import invoices, notifications
 from .cart import Cart
-from .models import Order, OrderItem
-
-
-def digits_only(s: str) -> str:
-    return "".join(ch for ch in (s or "") if ch.isdigit())
+from .models import Order
+from .pricing import price_cart, price_order
+from .stock import reserve_stock
 
 
 # -----------------------------
@@ -26,26 +26,8 @@ def digits_only(s: str) -> str:
 @login_required
 def cart_detail(request):
     cart = Cart(request)
-    product_ids = cart.cart.keys()
-    products = Product.objects.filter(id__in=product_ids)
-
-    items = []
-    total = Decimal("0.00")
-
-    for p in products:
-        qty = int(cart.cart.get(str(p.id), 0))
-        price = Decimal(str(p.price))
-        subtotal = price * qty
-        total += subtotal
-
-        items.append({
-            "product": p,
-            "qty": qty,
-            "price": price,
-            "subtotal": subtotal,
-        })
-
-    return render(request, "orders/cart.html", {"items": items, "total": total})
+    pricing = price_cart(cart.cart)
+    return render(request, "orders/cart.html", {"items": pricing.lines, "total": pricing.total})
 
 
 @login_required
@@ -73,6 +55,119 @@ def cart_remove(request, product_id):
     return redirect("cart_detail")
 
 
+# -----------------------------
+# CART API (JSON, for the cart page's fetch() calls)
+# -----------------------------
+def _api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Login required."}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _line_json(line):
+    return {
+        "product_id": line.product_id,
+        "name": line.name,
+        "qty": line.qty,
+        "price": str(line.price),
+        "subtotal": str(line.subtotal),
+    }
+
+
+def _cart_json(pricing):
+    return {
+        "lines": len(pricing.lines),
+        "quantity": sum(line.qty for line in pricing.lines),
+        "total": str(pricing.total),
+    }
+
+
+def _save_priced(cart, pricing):
+    """Drop products that no longer exist from the cart, then save it."""
+    for pid in [pid for pid in cart.cart if int(pid) not in pricing.products]:
+        del cart.cart[pid]
+    cart.save()
+
+
+def _cart_line_response(cart, product_id):
+    # one query prices the whole cart; the changed line is picked from it
+    pricing = price_cart(cart.cart)
+    if product_id not in pricing.products and str(product_id) in cart.cart:
+        return JsonResponse({"error": "Product not found."}, status=404)
+
+    _save_priced(cart, pricing)
+    line = next((l for l in pricing.lines if l.product_id == product_id), None)
+    return JsonResponse({
+        "line": _line_json(line) if line else None,
+        "cart": _cart_json(pricing),
+    })
+
+
+@require_POST
+@_api_login_required
+def cart_api_add(request, product_id):
+    cart = Cart(request)
+    cart.cart[str(product_id)] = cart.cart.get(str(product_id), 0) + 1
+    return _cart_line_response(cart, product_id)
+
+
+@require_POST
+@_api_login_required
+def cart_api_update(request, product_id):
+    cart = Cart(request)
+    try:
+        qty = int(request.POST.get("qty", "1"))
+    except ValueError:
+        return JsonResponse({"error": "qty must be a whole number."}, status=400)
+
+    if qty > 0:
+        cart.cart[str(product_id)] = qty
+    else:
+        cart.cart.pop(str(product_id), None)
+    return _cart_line_response(cart, product_id)
+
+
+@require_POST
+@_api_login_required
+def cart_api_remove(request, product_id):
+    cart = Cart(request)
+    cart.cart.pop(str(product_id), None)
+    return _cart_line_response(cart, product_id)
+
+
+@require_POST
+@_api_login_required
+def cart_api_set(request):
+    """
+    Set many quantities in one request: {"items": {"12": 3, "45": 0}}.
+    A quantity of 0 removes the line; products not listed are untouched.
+    """
+    try:
+        items = json.loads(request.body)["items"]
+        changes = {str(int(pid)): int(qty) for pid, qty in items.items()}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": 'Expected {"items": {"<product id>": <qty>, ...}}.'}, status=400)
+
+    cart = Cart(request)
+    for pid, qty in changes.items():
+        if qty > 0:
+            cart.cart[pid] = qty
+        else:
+            cart.cart.pop(pid, None)
+
+    pricing = price_cart(cart.cart)
+    unknown = sorted(int(pid) for pid in cart.cart if int(pid) not in pricing.products)
+    _save_priced(cart, pricing)
+    return JsonResponse({
+        "lines": [_line_json(line) for line in pricing.lines],
+        "unknown": unknown,
+        "cart": _cart_json(pricing),
+    })
+
+
 # -----------------------------
 # CHECKOUT + CREATE ORDER
 # -----------------------------
@@ -86,18 +181,7 @@ def checkout(request):
 
     profile, _ = CustomerProfile.objects.get_or_create(user=request.user)
 
-    product_ids = cart.cart.keys()
-    products = Product.objects.filter(id__in=product_ids)
-
-    items = []
-    total = Decimal("0.00")
-
-    for p in products:
-        qty = int(cart.cart.get(str(p.id), 0))
-        price = Decimal(str(p.price))
-        subtotal = price * qty
-        total += subtotal
-        items.append({"product": p, "qty": qty, "price": price, "subtotal": subtotal})
+    pricing = price_cart(cart.cart)
 
     if request.method == "POST":
         fulfillment = request.POST.get("fulfillment", "pickup")
@@ -115,46 +199,42 @@ def checkout(request):
         profile.address = address
         profile.save()
 
-        order = Order.objects.create(
-            user=request.user,
-            fulfillment=fulfillment,
-            phone=phone,
-            whatsapp=whatsapp,
-            address=address,
-            notes=notes,
-        )
-
-        created_any_item = False
-
-        # create items + reduce stock_quantity
-        for p in products:
-            requested_qty = int(cart.cart.get(str(p.id), 0))
-            if requested_qty <= 0:
-                continue
-
-            available = int(p.stock_quantity)
-            qty_to_add = min(requested_qty, available)
-
-            if qty_to_add > 0:
-                OrderItem.objects.create(order=order, product=p, qty=qty_to_add)
-                created_any_item = True
-                p.stock_quantity = available - qty_to_add
-                p.save()
+        # create order + items and reduce stock_quantity in one transaction
+        with transaction.atomic():
+            reservation = reserve_stock(pricing.quantities)
+
+            if reservation.any_filled:
+                order = reservation.create_order(Order(
+                    user=request.user,
+                    fulfillment=fulfillment,
+                    phone=phone,
+                    whatsapp=whatsapp,
+                    address=address,
+                    notes=notes,
+                ), pricing.products)
+                # sent by the drain_outbox worker once this commits
+                notifications.enqueue_order_placed(order)
 
         cart.clear()
 
-        if not created_any_item:
-            order.delete()
+        if not reservation.any_filled:
             messages.error(request, "Sorry, items are out of stock. Please try again.")
             return redirect("cart_detail")
 
+        for line in reservation.shortfalls:
+            name = pricing.products[line.product_id].name
+            if line.is_empty:
+                messages.warning(request, f"{name} is out of stock and was not added to your order.")
+            else:
+                messages.warning(request, f"Only {line.filled} of {line.requested} × {name} were available.")
+
         messages.success(request, f"Order placed successfully! Order ID: {order.id}")
         return redirect("order_success", order_id=order.id)
 
     return render(request, "orders/checkout.html", {
         "profile": profile,
-        "items": items,
-        "total": total
+        "items": pricing.lines,
+        "total": pricing.total
     })
 
 
@@ -164,33 +244,15 @@ def checkout(request):
 @login_required
 def order_success(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
+    # username and lines come from the order's summary, not more queries
+    pricing = price_order(order)
 
-    # Shop WhatsApp message
-    lines = []
-    lines.append(f"New Order #{order.id}")
-    lines.append(f"Customer: {order.user.username}")
-    lines.append(f"Phone: {order.phone}")
-    lines.append(f"Customer WhatsApp: {order.whatsapp}")
-    lines.append(f"Fulfillment: {order.get_fulfillment_display()}")
-
-    if order.address:
-        lines.append(f"Address: {order.address}")
-    if order.notes:
-        lines.append(f"Notes: {order.notes}")
-
-    lines.append("")
-    lines.append("Items:")
-    for item in order.items.all():
-        lines.append(f"- {item.product.name} × {item.qty}")
-
-    lines.append("")
-    lines.append("Please confirm this order.")
-
-    message = "\n".join(lines)
+    message = notifications.order_placed_message(order, pricing)
     shop_url = f"https://wa.me/{digits_only(settings.WHATSAPP_ORDER_NUMBER)}?text={urllib.parse.quote(message)}"
 
     return render(request, "orders/order_success.html", {
         "order": order,
+        "items": pricing.lines,
         "whatsapp_url": shop_url
     })
 
@@ -202,102 +264,33 @@ def order_success(request, order_id):
 def invoice_view(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
 
-    items = []
-    total = Decimal("0.00")
-    for it in order.items.all():
-        price = Decimal(str(it.product.price))
-        subtotal = price * it.qty
-        total += subtotal
-        items.append({"name": it.product.name, "qty": it.qty, "price": price, "subtotal": subtotal})
+    pricing = price_order(order)
 
-    return render(request, "orders/invoice.html", {"order": order, "items": items, "total": total})
+    return render(request, "orders/invoice.html", {"order": order, "items": pricing.lines, "total": pricing.total})
 
 
 # -----------------------------
 # INVOICE PDF (Download)
 # -----------------------------
+def _invoice_etag(request, order_id):
+    revision = (
+        Order.objects.filter(id=order_id, user=request.user)
+        .values_list("revision", flat=True)
+        .first()
+    )
+    return invoices.etag(order_id, revision) if revision else None
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_invoice_etag)
 def invoice_pdf(request, order_id):
     order = get_object_or_404(Order, id=order_id, user=request.user)
 
-    lines = []
-    total = Decimal("0.00")
-    for it in order.items.all():
-        price = Decimal(str(it.product.price))
-        subtotal = price * it.qty
-        total += subtotal
-        lines.append((it.product.name, it.qty, str(price), str(subtotal)))
-
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = f'attachment; filename="invoice_order_{order.id}.pdf"'
-
-    p = canvas.Canvas(response, pagesize=A4)
-    width, height = A4
-
-    y = height - 60
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(50, y, "Sri Maha Laxmi Traders")
-
-    y -= 18
-    p.setFont("Helvetica", 10)
-    p.drawString(50, y, "6-8-151, Namdevada, Nizamabad 503002, Telangana")
-    y -= 14
-    p.drawString(50, y, "Phone: +91 9440574394, +91 7386034104")
-    y -= 14
-    p.drawString(50, y, "Email: santhoshchanda4@gmail.com, likith.chanda0404@gmail.com")
-
-    y -= 26
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(50, y, f"INVOICE - Order #{order.id}")
-    y -= 16
-
-    p.setFont("Helvetica", 10)
-    p.drawString(50, y, f"Customer: {order.user.username}")
-    y -= 14
-    p.drawString(50, y, f"Phone: {order.phone}   WhatsApp: {order.whatsapp}")
-    y -= 14
-    p.drawString(50, y, f"Fulfillment: {order.get_fulfillment_display()}   Status: {order.status}")
-    y -= 14
-
-    if order.address:
-        p.drawString(50, y, f"Address: {order.address[:90]}")
-        y -= 14
-
-    y -= 10
-    p.setFont("Helvetica-Bold", 10)
-    p.drawString(50, y, "Item")
-    p.drawString(300, y, "Qty")
-    p.drawString(350, y, "Price")
-    p.drawString(430, y, "Subtotal")
-
-    y -= 10
-    p.line(50, y, 545, y)
-    y -= 14
-
-    p.setFont("Helvetica", 10)
-    for name, qty, price, subtotal in lines:
-        if y < 80:
-            p.showPage()
-            y = height - 60
-            p.setFont("Helvetica", 10)
-
-        p.drawString(50, y, name[:38])
-        p.drawString(300, y, str(qty))
-        p.drawString(350, y, f"₹ {price}")
-        p.drawString(430, y, f"₹ {subtotal}")
-        y -= 14
-
-    y -= 10
-    p.line(50, y, 545, y)
-    y -= 18
-
-    p.setFont("Helvetica-Bold", 12)
-    p.drawString(350, y, f"TOTAL: ₹ {total}")
-
-    y -= 28
-    p.setFont("Helvetica", 10)
-    p.drawString(50, y, "Thank you for shopping with Sri Maha Laxmi Traders!")
-
-    p.showPage()
-    p.save()
-    return response
+    name = invoices.get_or_render(order)
+    return FileResponse(
+        invoices.storage().open(name, "rb"),
+        as_attachment=True,
+        filename=f"invoice_order_{order.id}.pdf",
+        content_type="application/pdf",
+    )